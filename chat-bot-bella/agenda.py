@@ -0,0 +1,123 @@
+import threading
+from datetime import date
+
+# Agenda do salão, usada pelo bot e pelo relatório do histórico
+COLABORADORAS = ["Ana", "Beatriz", "Carla"]
+HORARIOS_DISPONIVEIS = ["10:00", "11:00", "14:00", "15:00", "16:00"]
+DIAS_FUNCIONAMENTO = {0, 1, 2, 3, 4, 5}  # Segunda a sábado (0 = segunda)
+# Exceções à jornada por profissional: {colaboradora: {dia da semana: [horários]}}, ex: {"Carla": {5: ["10:00"]}}
+JORNADAS = {}
+
+
+class CalendarioOcupacao:
+    """Ocupação dos próximos dias em memória: um bitmap de horários por dia e por profissional.
+
+    O bit i de cada bitmap corresponde a `horarios[i]`. A jornada de cada profissional
+    (dias de funcionamento do salão e exceções por dia da semana em `jornadas`) também é
+    um bitmap, então os horários livres de um dia saem de `jornada & ~ocupados`, sem
+    consultar o banco. O calendário é carregado uma vez e mantido em dia por marcar() /
+    desmarcar(); sincronizar() só volta ao banco quando outra conexão (outro processo,
+    por exemplo) alterou os agendamentos.
+    """
+
+    def __init__(self, horarios, colaboradoras, dias_funcionamento=range(7), jornadas=None):
+        self.horarios = list(horarios)
+        self.colaboradoras = list(colaboradoras)
+        self._bit = {horario: 1 << i for i, horario in enumerate(self.horarios)}
+        self._indice = {colaboradora: i for i, colaboradora in enumerate(self.colaboradoras)}
+        # Jornada de cada profissional por dia da semana (0 = segunda)
+        todos = (1 << len(self.horarios)) - 1
+        self._jornada = [[todos if dia in dias_funcionamento else 0 for _ in self.colaboradoras] for dia in range(7)]
+        for colaboradora, por_dia in (jornadas or {}).items():
+            for dia, horarios_do_dia in por_dia.items():
+                bits = 0
+                for horario in horarios_do_dia:
+                    bits |= self._bit[horario]
+                self._jornada[dia][self._indice[colaboradora]] = bits
+        self._ocupados = {}  # ordinal do dia -> [bitmap por profissional]
+        self._carregado_desde = None
+        self._versoes = {}   # id(conexão) -> PRAGMA data_version já visto
+        self._lock = threading.Lock()
+
+    def _alterar(self, data, colaboradora, horario, ocupar):
+        bit = self._bit.get(horario)
+        indice = self._indice.get(colaboradora)
+        if bit is None or indice is None:
+            return
+        dia = date.fromisoformat(data).toordinal()
+        ocupados = self._ocupados.get(dia)
+        if ocupados is None:
+            if not ocupar:
+                return
+            ocupados = self._ocupados[dia] = [0] * len(self.colaboradoras)
+        ocupados[indice] = ocupados[indice] | bit if ocupar else ocupados[indice] & ~bit
+
+    def marcar(self, data, colaboradora, horario):
+        """Registra um agendamento (data AAAA-MM-DD)"""
+        with self._lock:
+            self._alterar(data, colaboradora, horario, True)
+
+    def desmarcar(self, data, colaboradora, horario):
+        """Registra um cancelamento"""
+        with self._lock:
+            self._alterar(data, colaboradora, horario, False)
+
+    def carregar(self, conexao, desde):
+        """(Re)carrega os agendamentos a partir do dia `desde` (AAAA-MM-DD) em uma única consulta"""
+        linhas = conexao.execute(
+            "SELECT data, colaboradora, horario FROM agendamentos WHERE data >= ?", (desde,)
+        ).fetchall()
+        with self._lock:
+            self._ocupados = {}
+            for data, colaboradora, horario in linhas:
+                self._alterar(data, colaboradora, horario, True)
+            self._carregado_desde = desde
+
+    def sincronizar(self, conexao, desde):
+        """Recarrega se ainda não carregou ou se outra conexão gravou no banco desde a última vez"""
+        versao = conexao.execute("PRAGMA data_version").fetchone()[0]
+        chave = id(conexao)
+        if self._carregado_desde is None or desde < self._carregado_desde or self._versoes.get(chave) != versao:
+            self.carregar(conexao, desde)
+            self._versoes[chave] = versao
+
+    def jornada(self, dia, colaboradora):
+        """Horários em que a profissional atende no dia (date)"""
+        bits = self._jornada[dia.weekday()][self._indice[colaboradora]]
+        return [horario for horario, bit in self._bit.items() if bits & bit]
+
+    def proximos_livres(self, quantidade=5, dias=60, inicio=None, colaboradoras=None, a_partir_de=None):
+        """Primeiros `quantidade` horários livres [(data, colaboradora, horário)] nos próximos `dias`
+
+        A busca começa em `inicio` (date, hoje por padrão); nesse primeiro dia só entram os
+        horários depois de `a_partir_de` ("HH:MM"). O resultado sai em ordem cronológica.
+        """
+        inicio = inicio or date.today()
+        indices = [self._indice[c] for c in colaboradoras] if colaboradoras else list(range(len(self.colaboradoras)))
+        indices.sort()
+        primeiro_dia = inicio.toordinal()
+        sem_ocupacao = [0] * len(self.colaboradoras)
+        filtro_inicio = 0
+        if a_partir_de is not None:
+            for horario, bit in self._bit.items():
+                if horario <= a_partir_de:
+                    filtro_inicio |= bit
+        encontrados = []
+        with self._lock:
+            for dia in range(primeiro_dia, primeiro_dia + dias):
+                jornada = self._jornada[(dia - 1) % 7]  # date.fromordinal(1) é uma segunda-feira
+                ocupados = self._ocupados.get(dia, sem_ocupacao)
+                bloqueio = filtro_inicio if dia == primeiro_dia else 0
+                livres = [(i, jornada[i] & ~ocupados[i] & ~bloqueio) for i in indices]
+                if not any(bits for _, bits in livres):
+                    continue
+                data = None
+                for horario, bit in self._bit.items():
+                    for i, bits in livres:
+                        if bits & bit:
+                            data = data or date.fromordinal(dia).isoformat()
+                            encontrados.append((data, self.colaboradoras[i], horario))
+                            if len(encontrados) == quantidade:
+                                return encontrados
+        return encontrados
+
@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+ARQUIVO_BANCO = "agendamentos.db"  # Nome do arquivo do banco de dados SQLite
+
+# Migrações do esquema, aplicadas em ordem. O número de cada uma fica gravado em
+# PRAGMA user_version, então cada migração roda uma única vez por banco.
+MIGRACOES = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS agendamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            nome_cliente TEXT,
+            telefone TEXT,
+            colaboradora TEXT,
+            servico TEXT,
+            horario TEXT
+        )
+        """,
+    ]),
+    (2, [
+        # Data do atendimento (AAAA-MM-DD), separada do momento em que o agendamento foi feito.
+        # Até aqui o bot só agendava para o próprio dia, então a data vem do timestamp.
+        "ALTER TABLE agendamentos ADD COLUMN data TEXT",
+        """
+        UPDATE agendamentos
+        SET data = substr(timestamp, 7, 4) || '-' || substr(timestamp, 4, 2) || '-' || substr(timestamp, 1, 2)
+        WHERE data IS NULL
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_agendamentos_data_colaboradora_horario
+        ON agendamentos (data, colaboradora, horario)
+        """,
+    ]),
+    (3, [
+        # Um único agendamento por (dia, profissional, horário): o banco garante a exclusividade
+        "DROP INDEX IF EXISTS idx_agendamentos_data_colaboradora_horario",
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_agendamentos_horario_unico
+        ON agendamentos (data, colaboradora, horario)
+        """,
+    ]),
+]
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",     # Leitores não bloqueiam o escritor (e vice-versa)
+    "PRAGMA synchronous = NORMAL",   # Em WAL, fsync apenas nos checkpoints
+    "PRAGMA cache_size = -8000",     # ~8 MB de cache de páginas por conexão
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",    # Espera até 5 s por um lock em vez de falhar na hora
+]
+
+
+class BancoDados:
+    """Camada de acesso ao SQLite com uma conexão persistente por thread.
+
+    As conexões são abertas sob demanda, configuradas uma única vez com os PRAGMAs
+    acima e reaproveitadas em todas as operações da mesma thread, junto com o cache de
+    comandos preparados do módulo sqlite3.
+    """
+
+    def __init__(self, arquivo, comandos_em_cache=128):
+        self.arquivo = arquivo
+        self.comandos_em_cache = comandos_em_cache
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock = threading.Lock()
+        self._lock_migracao = threading.Lock()
+        self._migrado = False
+
+    def conexao(self):
+        """Retorna a conexão da thread atual, abrindo-a na primeira chamada"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            # check_same_thread=False apenas para permitir fechar() a partir de outra thread
+            conexao = sqlite3.connect(self.arquivo, cached_statements=self.comandos_em_cache,
+                                      check_same_thread=False)
+            for pragma in PRAGMAS:
+                conexao.execute(pragma)
+            self._local.conexao = conexao
+            with self._lock:
+                self._conexoes.append(conexao)
+        return conexao
+
+    @contextmanager
+    def transacao(self):
+        """Transação de escrita com BEGIN IMMEDIATE (o lock de escrita é obtido já no início)"""
+        conexao = self.conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexao
+        except BaseException:
+            conexao.rollback()
+            raise
+        conexao.commit()
+
+    def migrar(self):
+        """Cria/atualiza o esquema aplicando as migrações pendentes (uma vez por processo)"""
+        with self._lock_migracao:
+            if self._migrado:
+                return
+            # BEGIN IMMEDIATE impede que outro processo aplique as mesmas migrações ao mesmo tempo
+            with self.transacao() as conexao:
+                versao_atual = conexao.execute("PRAGMA user_version").fetchone()[0]
+                for versao, comandos in MIGRACOES:
+                    if versao <= versao_atual:
+                        continue
+                    for comando in comandos:
+                        conexao.execute(comando)
+                    conexao.execute(f"PRAGMA user_version = {versao}")
+            self._migrado = True
+
+    def fechar(self):
+        """Fecha as conexões de todas as threads"""
+        with self._lock:
+            for conexao in self._conexoes:
+                conexao.close()
+            self._conexoes.clear()
+        self._migrado = False
+        self._local = threading.local()
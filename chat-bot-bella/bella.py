@@ -1,20 +1,56 @@
-import requests
-from datetime import datetime
+import asyncio
+import atexit
+from datetime import date, datetime
 import os
 from dotenv import load_dotenv
-import time
 import random
-import sqlite3  # Importa a biblioteca do SQLite
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from agenda import COLABORADORAS, DIAS_FUNCIONAMENTO, HORARIOS_DISPONIVEIS, JORNADAS, CalendarioOcupacao
+from armazenamento import ARQUIVO_BANCO, BancoDados
+from topicos import classificar_topico
+from cache_respostas import CacheRespostas
+from disjuntor import DisjuntorCircuito
+from escalonador import EscalonadorGemini
+from indice_faq import IndiceFAQ
+from memoria_conversa import MemoriaConversa, estimar_tokens
+from metricas import BALDES_BYTES, RegistroMetricas
+from cliente_gemini import ClienteGeminiAsync, ErroHTTPGemini, extrair_texto
 
 # Carrega variáveis de ambiente
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
-URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={API_KEY}"
-
-# Constantes
-COLABORADORAS = ["Ana", "Beatriz", "Carla"]
-HORARIOS_DISPONIVEIS = ["10:00", "11:00", "14:00", "15:00", "16:00"]
-ARQUIVO_BANCO = "agendamentos.db"  # Nome do arquivo do banco de dados SQLite
+# GEMINI_URL permite apontar o bot para um servidor local (ex: mock_gemini.py)
+URL = os.getenv("GEMINI_URL") or f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={API_KEY}"
+
+# Métricas de desempenho (BELLA_METRICAS=1 liga; BELLA_RASTREIO=1 guarda também os eventos por sessão)
+METRICAS = RegistroMetricas(ativo=os.getenv("BELLA_METRICAS") == "1", rastreio=os.getenv("BELLA_RASTREIO") == "1")
+METRICAS.descrever("bella_gemini_latencia_segundos", "Duração de cada consulta ao Gemini, por origem e resultado")
+METRICAS.descrever("bella_gemini_tentativas_extras_total", "Novas tentativas após falha do Gemini")
+METRICAS.descrever("bella_gemini_cache_total", "Consultas ao cache de respostas (acerto/falha)")
+METRICAS.descrever("bella_gemini_fallbacks_total", "Consultas respondidas com RESPOSTAS_FALLBACK")
+METRICAS.descrever("bella_gemini_espera_fila_segundos", "Tempo na fila do escalonador antes de cada chamada")
+METRICAS.descrever("bella_gemini_fila_profundidade", "Chamadas aguardando a vez no escalonador")
+METRICAS.descrever("bella_gemini_prompt_bytes", "Tamanho do prompt enviado (sem a personalidade)")
+METRICAS.descrever("bella_gemini_resposta_bytes", "Tamanho da resposta do Gemini")
+METRICAS.descrever("bella_gemini_tokens_prompt", "Tokens de entrada por chamada (usageMetadata), incluindo os em cache")
+METRICAS.descrever("bella_gemini_tokens_em_cache", "Tokens de entrada servidos do conteúdo em cache")
+METRICAS.descrever("bella_gemini_tokens_resposta", "Tokens gerados por chamada")
+METRICAS.descrever("bella_sqlite_segundos", "Duração das funções *_sqlite")
+METRICAS.descrever("bella_banco_ocupado_total", "Mensagens respondidas com 'tente de novo' por lock do SQLite")
+METRICAS.descrever("bella_agenda_busca_segundos", "Busca dos próximos horários livres no calendário de ocupação")
+METRICAS.descrever("bella_topico_verificacoes_total", "Resultados do classificador de escopo")
+METRICAS.descrever("bella_faq_consultas_total", "Buscas no índice local de perguntas (acerto/falha)")
+METRICAS.descrever("bella_mensagem_segundos", "Tempo para processar uma mensagem, pelo estado da conversa")
+
+# Constantes (a agenda do salão, COLABORADORAS/HORARIOS_DISPONIVEIS/DIAS_FUNCIONAMENTO/JORNADAS, fica em agenda.py)
+DIAS_BUSCA_HORARIOS = 60  # Até quantos dias à frente procurar horários quando hoje está lotado
+DIAS_SEMANA = ["seg", "ter", "qua", "qui", "sex", "sáb", "dom"]
+ARQUIVO_CACHE = os.path.join(os.path.dirname(ARQUIVO_BANCO), "cache_respostas.db")  # Cache persistente do Gemini
+ARQUIVO_FAQ = os.path.join(os.path.dirname(ARQUIVO_BANCO), "faq.db")  # Perguntas respondidas localmente
 NOME_SALAO = "Bella Beauty Salon"
 
 # Personalidade do Bot com restrições explícitas
@@ -66,6 +102,54 @@ RESPOSTAS_FALLBACK = [
     "Sua satisfação é nossa prioridade! Para responder de forma personalizada sobre esse assunto de cabelos e unhas, recomendo que converse diretamente com uma de nossas especialistas."
 ]
 
+# Cliente HTTP assíncrono com conexões keep-alive e no máximo 10 requisições simultâneas.
+# A personalidade vai como systemInstruction (GEMINI_MODO_PERSONA=cache|sistema|inline).
+CLIENTE_GEMINI = ClienteGeminiAsync(URL, tamanho_pool=10, timeout_conexao=5, timeout_leitura=60,
+                                    max_simultaneas=10, instrucoes_sistema=INSTRUCOES_PERSONALIDADE,
+                                    modo_persona=os.getenv("GEMINI_MODO_PERSONA", "sistema"), metricas=METRICAS)
+
+# Disjuntor compartilhado: após 5 falhas seguidas, responde com fallback por 30 s antes de testar de novo
+DISJUNTOR_GEMINI = DisjuntorCircuito(limite_falhas=5, tempo_aberto=30)
+
+# Prazo total (segundos) de cada tipo de consulta ao Gemini, somando tentativas e esperas
+PRAZOS_GEMINI = {
+    "confirmacao": 3,
+    "despedida": 3,
+    "sugestao_indecisa": 8,
+    "sugestao": 15,
+    "duvida": 15,
+    "resumo": 10,
+    "faq": 15,
+}
+
+# Ordem na fila do Gemini (menor passa primeiro); a partir de 2, descartáveis com a fila cheia
+PRIORIDADES_GEMINI = {
+    "confirmacao": 0,
+    "sugestao_indecisa": 1,
+    "sugestao": 1,
+    "duvida": 1,
+    "despedida": 2,
+    "resumo": 3,
+    "faq": 3,
+}
+
+# Cota do Gemini (GEMINI_RPM requisições e GEMINI_TPM tokens de entrada por minuto; padrão do plano gratuito)
+# e no máximo 10 chamadas por minuto por cliente
+ESCALONADOR_GEMINI = EscalonadorGemini(requisicoes_por_minuto=int(os.getenv("GEMINI_RPM", "15")),
+                                       tokens_por_minuto=int(os.getenv("GEMINI_TPM", "1000000")),
+                                       requisicoes_por_telefone=10, profundidade_maxima=20)
+TOKENS_PERSONA = estimar_tokens(INSTRUCOES_PERSONALIDADE)
+
+# BELLA_RESUMO_GEMINI=1: o Gemini condensa o resumo do histórico das sessões em segundo plano
+CONDENSAR_MEMORIA = os.getenv("BELLA_RESUMO_GEMINI") == "1"
+
+# Cache das respostas do Gemini (memória + SQLite) para prompts que se repetem
+CACHE_GEMINI = CacheRespostas(capacidade=512, arquivo=ARQUIVO_CACHE)
+
+# Respostas aprovadas pelo salão (python indice_faq.py pendentes / aprovar ID) dadas sem chamar o Gemini.
+# FAQ_VOTOS_PARA_APROVAR liga a aprovação automática após esse número de clientes (telefones) distintas.
+INDICE_FAQ = IndiceFAQ(arquivo=ARQUIVO_FAQ, votos_para_aprovar=int(os.getenv("FAQ_VOTOS_PARA_APROVAR", "0")) or None)
+
 
 def esta_em_horario_comercial():
     """Verifica se o horário atual está dentro do horário comercial (8h-17h)"""
@@ -73,353 +157,1035 @@ def esta_em_horario_comercial():
     return 8 <= hora_atual <= 24
 
 
+def buscar_resposta_local(pergunta, tipo):
+    """Procura a pergunta no índice de FAQ; retorna (id, resposta) ou None"""
+    encontrada = INDICE_FAQ.buscar(pergunta, tipo)
+    METRICAS.contar("bella_faq_consultas_total", tipo=tipo, resultado="falha" if encontrada is None else "acerto")
+    return encontrada and encontrada[:2]
+
+
+def eh_resposta_fallback(texto):
+    """Indica se o texto contém uma das RESPOSTAS_FALLBACK (não deve entrar no índice de FAQ)"""
+    return any(fallback in texto for fallback in RESPOSTAS_FALLBACK)
+
+
 def verificar_topico_permitido(texto):
     """Verifica se o assunto está dentro do escopo permitido (cabelos e unhas)"""
-    palavras_cabelo = ['cabelo', 'corte', 'tintura', 'coloração', 'mechas', 'penteado', 'alisamento',
-                      'hidratação', 'reconstrução', 'queratina', 'shampoo', 'condicionador', 'tratamento',
-                      'raiz', 'ponta', 'fio', 'volume', 'brilho', 'caspa', 'couro cabeludo', 'secador',
-                      'chapinha', 'babyliss', 'cachos', 'lisos', 'ondulados', 'crespos', 'loiro',
-                      'morena', 'ruiva', 'grisalho', 'tinta', 'descoloração', 'escova', 'permanente']
+    permitido = classificar_topico(texto) is not None
+    METRICAS.contar("bella_topico_verificacoes_total", resultado="permitido" if permitido else "recusado")
+    return permitido
+
+
+class PrazoEsgotado(Exception):
+    """O prazo de quem chamou acabou antes da resposta; não é uma falha do Gemini"""
+
+
+def _descrever_erro(erro):
+    if isinstance(erro, PrazoEsgotado):
+        return "Prazo esgotado"
+    if isinstance(erro, ErroHTTPGemini) and erro.status == 503:
+        return "Serviço temporariamente indisponível"
+    if isinstance(erro, ErroHTTPGemini):
+        return f"Erro na API ({erro})"
+    if isinstance(erro, asyncio.TimeoutError):
+        return "Tempo esgotado"
+    return f"Erro: {str(erro)}"
+
+
+async def _com_prazo(aguardavel, limite):
+    """Aguarda respeitando o instante `limite` (time.monotonic); sem limite, aguarda normalmente
+
+    Lança PrazoEsgotado quando o limite passa. O timeout de leitura do cliente HTTP continua
+    saindo como asyncio.TimeoutError (esse sim conta como falha do Gemini).
+    """
+    if limite is None:
+        return await aguardavel
+    restante = limite - time.monotonic()
+    if restante <= 0:
+        aguardavel.close()
+        raise PrazoEsgotado()
+    try:
+        return await asyncio.wait_for(aguardavel, restante)
+    except asyncio.TimeoutError:
+        if time.monotonic() >= limite:
+            raise PrazoEsgotado() from None
+        raise
+
+
+def _categoria_fallback(motivo):
+    """Agrupa o motivo do fallback em poucas categorias, para não explodir os rótulos das métricas"""
+    if motivo == "disjuntor aberto":
+        return "disjuntor"
+    if motivo.startswith("Erro na API") or motivo.startswith("Serviço"):
+        return "http"
+    if motivo == "Tempo esgotado":
+        return "tempo"
+    if motivo == "Prazo esgotado":
+        return "prazo"
+    if motivo in ("limite_cliente", "fila_cheia", "espera_estimada", "prazo_na_fila"):
+        return motivo
+    return "erro"
+
+
+async def _aguardar_vez(origem, telefone, prompt_cliente, limite):
+    """Espera a vez no ESCALONADOR_GEMINI; retorna None se liberada ou o motivo do descarte"""
+    inicio = time.perf_counter()
+    tokens = estimar_tokens(prompt_cliente) + TOKENS_PERSONA
+    prazo = limite - time.monotonic() if limite is not None else None
+    try:
+        motivo = await _com_prazo(
+            ESCALONADOR_GEMINI.reservar_vez(PRIORIDADES_GEMINI.get(origem, 1), tokens, telefone, prazo), limite
+        )
+    except PrazoEsgotado:
+        motivo = "prazo_na_fila"
+    METRICAS.observar("bella_gemini_espera_fila_segundos", time.perf_counter() - inicio, origem=origem)
+    return motivo
 
-    palavras_unhas = ['unha', 'manicure', 'pedicure', 'esmalte', 'cutícula', 'gel', 'alongamento',
-                      'fibra', 'acrílica', 'nail art', 'francesinha', 'decoração', 'base', 'top coat',
-                      'acetona', 'lixa', 'alicate', 'fortalecedor', 'quebradiças', 'formato', 'curvatura']
 
-    palavras_salao = ['agendar', 'marcar', 'horário', 'serviço', 'atendimento', 'profissional', 'salão',
-                      'estilista', 'cabeleireiro', 'preço', 'valor', 'duração', 'produto', 'promoção',
-                      'desconto', 'bela', 'bella']
+async def condensar_memoria(memoria, texto, marca):
+    """Pede ao Gemini uma versão curta das linhas antigas do histórico (fora do caminho crítico)"""
+    resumo = None
+    try:
+        resposta = await consultar_gemini_async(
+            "Resuma em uma frase curta o que a cliente queria e o que a Bella respondeu nesta conversa:\n" + texto,
+            verificar_escopo=False,
+            max_tentativas=1,
+            origem="resumo"
+        )
+        if not eh_resposta_fallback(resposta):
+            resumo = resposta
+    finally:
+        memoria.aplicar_condensacao(resumo, marca)
 
-    todas_permitidas = palavras_cabelo + palavras_unhas + palavras_salao
 
-    texto = texto.lower()
-    for palavra in todas_permitidas:
-        if palavra.lower() in texto:
-            return True
+async def sugerir_para_faq(duvida, prompt, telefone):
+    """Gera sem o histórico da cliente a resposta candidata ao FAQ (fora do caminho crítico)
 
-    return False
+    O índice é compartilhado entre clientes: uma resposta gerada com o contexto de uma
+    conversa não pode ser oferecida a outra.
+    """
+    resposta = await consultar_gemini_async(prompt, verificar_escopo=False, tipo_cache="duvida", origem="faq",
+                                            telefone=telefone)
+    if not eh_resposta_fallback(resposta):
+        INDICE_FAQ.sugerir(duvida, resposta, "duvida", telefone)
 
 
-def consultar_gemini(prompt, contexto_conversacional=None, verificar_escopo=True, max_tentativas=3):
-    """Envia uma consulta para a API do Gemini e retorna a resposta com personalidade"""
+async def _aguardar_nova_tentativa(tentativa, motivo, limite):
+    """Espera o backoff exponencial com jitter; retorna False se a espera estourar o prazo"""
+    wait_time = (2 ** tentativa) + random.uniform(0, 1)
+    if limite is not None and time.monotonic() + wait_time >= limite:
+        return False
+    print(f"⚠️ {motivo}. Tentando novamente em {wait_time:.2f} segundos...")
+    await asyncio.sleep(wait_time)
+    return True
+
+
+class _ConsultaGemini:
+    """Estado de uma consulta ao Gemini, compartilhado pelas versões com e sem streaming
+
+    Concentra o que não depende do transporte: disjuntor, vez no escalonador, novas
+    tentativas com backoff, cache, fallback e métricas. Cada versão só faz a chamada
+    (gerar ou gerar_stream) dentro de `async for _ in consulta.tentativas()`.
+    """
+
+    def __init__(self, prompt_cliente, max_tentativas, tipo_cache, chave_cache, prazo, origem, telefone):
+        self.prompt_cliente = prompt_cliente
+        self.max_tentativas = max_tentativas
+        self.tipo_cache = tipo_cache
+        self.chave_cache = chave_cache
+        self.origem = origem
+        self.telefone = telefone
+        prazo = prazo or PRAZOS_GEMINI.get(origem)
+        self.limite = time.monotonic() + prazo if prazo else None
+        self.inicio = time.perf_counter()
+        self.resultado = "fallback"
+        self.motivo = None
+        if METRICAS.ativo:
+            METRICAS.observar("bella_gemini_prompt_bytes", len(prompt_cliente.encode("utf-8")), BALDES_BYTES,
+                              origem=origem)
+
+    async def tentativas(self):
+        """Gera o número de cada tentativa liberada pelo disjuntor e pelo escalonador, com backoff entre elas"""
+        for tentativa in range(self.max_tentativas):
+            if tentativa:
+                if not await _aguardar_nova_tentativa(tentativa - 1, self.motivo, self.limite):
+                    return
+                METRICAS.contar("bella_gemini_tentativas_extras_total", origem=self.origem)
+            if not DISJUNTOR_GEMINI.permitir():
+                self.motivo = "disjuntor aberto"
+                return
+            self.motivo = await _aguardar_vez(self.origem, self.telefone, self.prompt_cliente, self.limite)
+            if self.motivo:
+                # Descartada pela fila sem chegar ao Gemini: se era o teste do meio_aberto, libera o teste
+                DISJUNTOR_GEMINI.desistir()
+                return
+            yield tentativa
+
+    def registrar_erro(self, erro):
+        """Registra a falha da tentativa; retorna False se não vale tentar de novo"""
+        self.motivo = _descrever_erro(erro)
+        if isinstance(erro, PrazoEsgotado):
+            # Acabou o orçamento desta consulta, não o Gemini: fallback sem contar falha no disjuntor
+            DISJUNTOR_GEMINI.desistir()
+            return False
+        DISJUNTOR_GEMINI.registrar_falha()
+        return True
+
+    def concluir(self, resposta):
+        """Resposta completa do Gemini: guarda no cache e registra o sucesso"""
+        DISJUNTOR_GEMINI.registrar_consulta(usou_fallback=False)
+        if self.tipo_cache:
+            CACHE_GEMINI.guardar(self.chave_cache, resposta, self.tipo_cache)
+        self.resultado = "ok"
+        METRICAS.observar("bella_gemini_resposta_bytes", len(resposta.encode("utf-8")), BALDES_BYTES,
+                          origem=self.origem)
+        return resposta
+
+    def fallback(self, categoria=None):
+        DISJUNTOR_GEMINI.registrar_consulta(usou_fallback=True)
+        METRICAS.contar("bella_gemini_fallbacks_total", origem=self.origem,
+                        motivo=categoria or _categoria_fallback(self.motivo))
+        return random.choice(RESPOSTAS_FALLBACK)
+
+    def medir_latencia(self):
+        METRICAS.observar("bella_gemini_latencia_segundos", time.perf_counter() - self.inicio,
+                          origem=self.origem, resultado=self.resultado)
+
+
+def _preparar_consulta(prompt, contexto_conversacional, verificar_escopo, max_tentativas, tipo_cache, chave_cache,
+                       prazo, origem, telefone):
+    """Retorna (resposta pronta, None) para recusa de escopo ou acerto no cache; senão (None, _ConsultaGemini)"""
+    if tipo_cache and chave_cache is not None and contexto_conversacional:
+        raise ValueError("chave_cache é compartilhada entre clientes: não envie contexto_conversacional")
     if verificar_escopo and not verificar_topico_permitido(prompt):
         return ("Desculpe, como assistente especializada do Bella Beauty Salon, posso ajudar apenas com "
-               "assuntos relacionados a cabelos e unhas. Posso responder sobre nossos serviços "
-               "de cabelo e manicure/pedicure. Em que posso ajudá-la com esses serviços?")
+                "assuntos relacionados a cabelos e unhas. Posso responder sobre nossos serviços "
+                "de cabelo e manicure/pedicure. Em que posso ajudá-la com esses serviços?"), None
 
-    prompt_completo = f"{INSTRUCOES_PERSONALIDADE}\n\nSolicitação da cliente: {prompt}"
+    prompt_cliente = f"Solicitação da cliente: {prompt}"
 
     if contexto_conversacional:
-        prompt_completo += f"\n\nContexto da conversa: {contexto_conversacional}"
-
-    for tentativa in range(max_tentativas):
+        prompt_cliente += f"\n\nContexto da conversa: {contexto_conversacional}"
+
+    origem = origem or "outro"
+    if tipo_cache:
+        if chave_cache is None:
+            chave_cache = f"{INSTRUCOES_PERSONALIDADE}\n\n{prompt_cliente}"
+        resposta_cache = CACHE_GEMINI.obter(chave_cache)
+        METRICAS.contar("bella_gemini_cache_total", origem=origem,
+                        resultado="falha" if resposta_cache is None else "acerto")
+        if resposta_cache is not None:
+            return resposta_cache, None
+    return None, _ConsultaGemini(prompt_cliente, max_tentativas, tipo_cache, chave_cache, prazo, origem, telefone)
+
+
+async def consultar_gemini_async(prompt, contexto_conversacional=None, verificar_escopo=True, max_tentativas=3,
+                                 tipo_cache=None, chave_cache=None, prazo=None, origem=None,
+                                 telefone=None):
+    """Envia uma consulta para a API do Gemini e retorna a resposta com personalidade
+
+    Se `tipo_cache` for informado (ex: "despedida", "duvida"), a resposta é buscada/guardada
+    no cache com o TTL desse tipo. Por padrão a chave é o prompt completo, com o contexto.
+    `chave_cache` troca a chave pelo modelo do prompt, e a resposta passa a ser servida a
+    qualquer cliente: o que vai ao Gemini também não pode ter dados da cliente (sem
+    `contexto_conversacional`; ValueError se vier). Sem `tipo_cache` o cache é ignorado.
+
+    `prazo` (segundos) limita o tempo total gasto com tentativas e esperas; estourado o
+    prazo, ou com o disjuntor aberto, a resposta vem de RESPOSTAS_FALLBACK na hora.
+    `origem` (ex: "confirmacao", "duvida") identifica quem chamou nas métricas e, se
+    `prazo` não for informado, escolhe o prazo em PRAZOS_GEMINI.
+
+    Cada tentativa espera a vez no ESCALONADOR_GEMINI, com a prioridade da `origem` e o
+    limite por `telefone`; chamadas descartadas pelo escalonador recebem o fallback.
+
+    As esperas entre tentativas usam asyncio.sleep, então outras conversas continuam
+    sendo atendidas enquanto esta aguarda o Gemini se recuperar.
+    """
+    pronta, consulta = _preparar_consulta(prompt, contexto_conversacional, verificar_escopo, max_tentativas,
+                                          tipo_cache, chave_cache, prazo, origem, telefone)
+    if consulta is None:
+        return pronta
+    try:
+        async for _ in consulta.tentativas():
+            try:
+                status, resposta_json = await _com_prazo(
+                    CLIENTE_GEMINI.gerar(consulta.prompt_cliente, consulta.origem), consulta.limite
+                )
+                if status == 200:
+                    DISJUNTOR_GEMINI.registrar_sucesso()
+                    return consulta.concluir(extrair_texto(resposta_json))
+                erro = ErroHTTPGemini(status)
+            except Exception as e:
+                erro = e
+            if not consulta.registrar_erro(erro):
+                break
+        return consulta.fallback()
+    finally:
+        consulta.medir_latencia()
+
+
+async def consultar_gemini_stream_async(prompt, contexto_conversacional=None, verificar_escopo=True,
+                                        max_tentativas=3, tipo_cache=None, chave_cache=None, prazo=None,
+                                        origem=None, telefone=None):
+    """Versão em streaming de consultar_gemini_async: gera os trechos da resposta à medida que chegam
+
+    Falhas antes do primeiro trecho seguem as mesmas regras de novas tentativas, `prazo`,
+    disjuntor e RESPOSTAS_FALLBACK (o prazo vale até o primeiro trecho). Se o streaming
+    cair no meio, o texto já enviado não pode ser desfeito: a resposta é encerrada com
+    uma frase de fallback em vez de recomeçar.
+    """
+    pronta, consulta = _preparar_consulta(prompt, contexto_conversacional, verificar_escopo, max_tentativas,
+                                          tipo_cache, chave_cache, prazo, origem, telefone)
+    if consulta is None:
+        yield pronta
+        return
+    try:
+        async for _ in consulta.tentativas():
+            trechos = []
+            gerador = CLIENTE_GEMINI.gerar_stream(consulta.prompt_cliente, consulta.origem)
+            try:
+                try:
+                    primeiro = await _com_prazo(gerador.__anext__(), consulta.limite)
+                except StopAsyncIteration:
+                    primeiro = None
+                DISJUNTOR_GEMINI.registrar_sucesso()
+                if primeiro is not None:
+                    trechos.append(primeiro)
+                    yield primeiro
+                    async for trecho in gerador:
+                        trechos.append(trecho)
+                        yield trecho
+                consulta.concluir("".join(trechos))
+                return
+            except Exception as e:
+                if trechos:
+                    # O texto já enviado não pode ser desfeito: encerra com uma frase de fallback
+                    DISJUNTOR_GEMINI.registrar_falha()
+                    print(f"⚠️ Streaming interrompido: {e}")
+                    yield "...\n\n" + consulta.fallback("streaming_interrompido")
+                    return
+                if not consulta.registrar_erro(e):
+                    break
+            finally:
+                await gerador.aclose()
+        yield consulta.fallback()
+    finally:
+        consulta.medir_latencia()
+
+
+_loop_gemini = None
+_lock_loop_gemini = threading.Lock()
+
+
+def _obter_loop_gemini():
+    """Event loop em uma thread de fundo, compartilhado pelas chamadas síncronas.
+
+    Manter um único loop preserva a sessão aiohttp (e suas conexões keep-alive)
+    entre uma consulta e outra.
+    """
+    global _loop_gemini
+    with _lock_loop_gemini:
+        if _loop_gemini is None:
+            _loop_gemini = asyncio.new_event_loop()
+            threading.Thread(target=_loop_gemini.run_forever, daemon=True).start()
+            atexit.register(_fechar_loop_gemini)
+        return _loop_gemini
+
+
+def _fechar_loop_gemini():
+    """Fecha a sessão HTTP do loop de fundo ao encerrar o programa"""
+    asyncio.run_coroutine_threadsafe(CLIENTE_GEMINI.fechar(), _loop_gemini).result(timeout=5)
+
+
+def consultar_gemini(prompt, contexto_conversacional=None, verificar_escopo=True, max_tentativas=3,
+                     tipo_cache=None, chave_cache=None, prazo=None, origem=None, telefone=None):
+    """Versão síncrona de consultar_gemini_async, para o atendimento pelo terminal"""
+    corotina = consultar_gemini_async(prompt, contexto_conversacional, verificar_escopo, max_tentativas,
+                                      tipo_cache, chave_cache, prazo, origem, telefone)
+    return asyncio.run_coroutine_threadsafe(corotina, _obter_loop_gemini()).result()
+
+
+def consultar_gemini_stream(prompt, contexto_conversacional=None, verificar_escopo=True, max_tentativas=3,
+                            tipo_cache=None, chave_cache=None, prazo=None, origem=None, telefone=None):
+    """Versão síncrona de consultar_gemini_stream_async: gerador com os trechos da resposta"""
+    fila = queue.Queue()
+    fim = object()
+
+    async def produzir():
         try:
-            headers = {"Content-Type": "application/json"}
-            data = {
-                "contents": [
-                    {
-                        "parts": [{"text": prompt_completo}]
-                    }
-                ]
-            }
-
-            response = requests.post(URL, headers=headers, json=data, timeout=60)
-
-            if response.status_code == 200:
-                resposta_json = response.json()
-                return resposta_json['candidates'][0]['content']['parts'][0]['text']
-            elif response.status_code == 503:
-                wait_time = (2 ** tentativa) + random.uniform(0, 1)
-                print(f"⚠️ Serviço temporariamente indisponível. Tentando novamente em {wait_time:.2f} segundos...")
-                time.sleep(wait_time)
-                continue
-            else:
-                if tentativa == max_tentativas - 1:
-                    return random.choice(RESPOSTAS_FALLBACK)
-                wait_time = (2 ** tentativa) + random.uniform(0, 1)
-                print(f"⚠️ Erro na API (código {response.status_code}). Tentando novamente em {wait_time:.2f} segundos...")
-                time.sleep(wait_time)
-
-        except requests.exceptions.Timeout:
-            if tentativa == max_tentativas - 1:
-                return random.choice(RESPOSTAS_FALLBACK)
-            wait_time = (2 ** tentativa) + random.uniform(0, 1)
-            print(f"⚠️ Tempo esgotado. Tentando novamente em {wait_time:.2f} segundos...")
-            time.sleep(wait_time)
-        except Exception as e:
-            if tentativa == max_tentativas - 1:
-                return random.choice(RESPOSTAS_FALLBACK)
-            wait_time = (2 ** tentativa) + random.uniform(0, 1)
-            print(f"⚠️ Erro: {str(e)}. Tentando novamente em {wait_time:.2f} segundos...")
-            time.sleep(wait_time)
-
-    return random.choice(RESPOSTAS_FALLBACK)
+            async for trecho in consultar_gemini_stream_async(prompt, contexto_conversacional, verificar_escopo,
+                                                              max_tentativas, tipo_cache, chave_cache, prazo,
+                                                              origem, telefone):
+                fila.put(trecho)
+        finally:
+            fila.put(fim)
+
+    asyncio.run_coroutine_threadsafe(produzir(), _obter_loop_gemini())
+    while (trecho := fila.get()) is not fim:
+        yield trecho
 
 
 # Funções para interagir com o banco de dados SQLite
+BANCO = BancoDados(ARQUIVO_BANCO)
+_BIT_HORARIO = {horario: 1 << i for i, horario in enumerate(HORARIOS_DISPONIVEIS)}
+# Ocupação dos próximos dias em memória, atualizada a cada agendamento e cancelamento
+CALENDARIO = CalendarioOcupacao(HORARIOS_DISPONIVEIS, COLABORADORAS, DIAS_FUNCIONAMENTO, JORNADAS)
+
+
 def conectar_bd():
-    return sqlite3.connect(ARQUIVO_BANCO)
+    """Retorna a conexão persistente da thread atual"""
+    return BANCO.conexao()
 
 def criar_tabela_agendamentos_sqlite():
-    conexao = conectar_bd()
-    cursor = conexao.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS agendamentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            nome_cliente TEXT,
-            telefone TEXT,
-            colaboradora TEXT,
-            servico TEXT,
-            horario TEXT
+    """Cria/atualiza o esquema do banco (executado uma vez na inicialização)"""
+    BANCO.migrar()
+
+@METRICAS.cronometrar_funcao("bella_sqlite_segundos")
+def registrar_agendamento_sqlite(nome, telefone, colaboradora, servico, horario, data=None):
+    """Reserva o horário de forma atômica e retorna (reservado, motivo, alternativas)
+
+    `data` (AAAA-MM-DD) é o dia do atendimento, hoje por padrão. O índice único em
+    (data, colaboradora, horario) garante que duas sessões nunca fiquem com o mesmo
+    horário. Na recusa, `motivo` é "ocupado" (outra reserva chegou antes) ou
+    "indisponivel" (fora da jornada da profissional ou horário que já passou), e
+    `alternativas` traz os horários ainda reserváveis do dia ({colaboradora: [horários]}).
+    """
+    agora = datetime.now()
+    timestamp = agora.strftime("%d/%m/%Y %H:%M")
+    data = data or agora.strftime("%Y-%m-%d")
+    if not horarios_reservaveis(data, colaboradora, [horario]):
+        return False, "indisponivel", alternativas_do_dia(data)
+    with BANCO.transacao() as conexao:
+        cursor = conexao.execute("""
+            INSERT INTO agendamentos (timestamp, nome_cliente, telefone, colaboradora, servico, horario, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (data, colaboradora, horario) DO NOTHING
+        """, (timestamp, nome, telefone, colaboradora, servico, horario, data))
+        reservado = cursor.rowcount == 1
+
+    if reservado:
+        CALENDARIO.marcar(data, colaboradora, horario)
+        return True, None, {}
+    return False, "ocupado", alternativas_do_dia(data)
+
+def horarios_reservaveis(data, colaboradora, horarios):
+    """Filtra os horários à jornada da profissional no dia (AAAA-MM-DD), sem os que já passaram"""
+    dia = date.fromisoformat(data)
+    agora = datetime.now()
+    if dia < agora.date() or colaboradora not in CALENDARIO.colaboradoras:
+        return []
+    jornada = CALENDARIO.jornada(dia, colaboradora)
+    a_partir_de = agora.strftime("%H:%M") if dia == agora.date() else ""
+    return [horario for horario in horarios if horario in jornada and horario > a_partir_de]
+
+def alternativas_do_dia(data):
+    """Horários ainda reserváveis no dia: {colaboradora: [horários]}, só profissionais com vaga"""
+    alternativas = {}
+    for colaboradora, livres in obter_horarios_livres_sqlite(data).items():
+        livres = horarios_reservaveis(data, colaboradora, livres)
+        if livres:
+            alternativas[colaboradora] = livres
+    return alternativas
+
+@METRICAS.cronometrar_funcao("bella_sqlite_segundos")
+def cancelar_agendamento_sqlite(data, colaboradora, horario):
+    """Cancela o agendamento do horário; retorna False se não havia agendamento"""
+    with BANCO.transacao() as conexao:
+        cursor = conexao.execute(
+            "DELETE FROM agendamentos WHERE data = ? AND colaboradora = ? AND horario = ?",
+            (data, colaboradora, horario)
         )
-    """)
-    conexao.commit()
-    conexao.close()
+    if cursor.rowcount == 1:
+        CALENDARIO.desmarcar(data, colaboradora, horario)
+        return True
+    return False
 
-def registrar_agendamento_sqlite(nome, telefone, colaboradora, servico, horario):
+@METRICAS.cronometrar_funcao("bella_sqlite_segundos")
+def obter_horarios_ocupados_sqlite(data=None, colaboradora=None):
+    """Retorna os horários já agendados no dia (hoje por padrão), opcionalmente de uma profissional"""
     conexao = conectar_bd()
-    cursor = conexao.cursor()
-    timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
-    cursor.execute("""
-        INSERT INTO agendamentos (timestamp, nome_cliente, telefone, colaboradora, servico, horario)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (timestamp, nome, telefone, colaboradora, servico, horario))
-    conexao.commit()
-    conexao.close()
-
-def obter_horarios_ocupados_sqlite():
-    conexao = conectar_bd()
-    cursor = conexao.cursor()
-    cursor.execute("SELECT horario FROM agendamentos")
-    resultados = cursor.fetchall()
+    data = data or datetime.now().strftime("%Y-%m-%d")
+    if colaboradora:
+        resultados = conexao.execute(
+            "SELECT horario FROM agendamentos WHERE data = ? AND colaboradora = ?", (data, colaboradora)
+        ).fetchall()
+    else:
+        resultados = conexao.execute("SELECT horario FROM agendamentos WHERE data = ?", (data,)).fetchall()
     horarios_ocupados = [resultado[0] for resultado in resultados]
-    conexao.close()
     return horarios_ocupados
 
+@METRICAS.cronometrar_funcao("bella_sqlite_segundos")
+def obter_horarios_livres_sqlite(data=None, colaboradoras=None):
+    """Retorna {colaboradora: [horários livres]} para o dia (hoje por padrão)
 
-def exibir_menu():
-    """Exibe o menu principal do bot"""
-    print(f"\n💬 Olá, eu sou a Bella! ✨ Seja bem-vinda ao {NOME_SALAO}!")
-    print("Especializada em serviços de cabelo e unhas.")
-    print("Como posso ajudar você hoje?")
-    print("1️⃣ Agendar horário")
-    print("2️⃣ Sugestões e dúvidas sobre cabelos e unhas")
-    print("3️⃣ Falar com uma atendente")
-    print("0️⃣ Sair")
-
-
-def exibir_horarios_disponiveis(horarios_livres):
-    """Exibe os horários disponíveis numerados para seleção"""
-    print("\n🕒 Horários disponíveis:")
-    for i, horario in enumerate(horarios_livres, 1):
-        print(f"{i}. {horario}")
-
-
-def selecionar_horario(horarios_livres):
-    """Permite ao usuário selecionar um horário da lista numerada"""
-    exibir_horarios_disponiveis(horarios_livres)
-
-    while True:
-        try:
-            escolha = input("\nDigite o número do horário desejado: ").strip()
-            indice = int(escolha) - 1
-
-            if 0 <= indice < len(horarios_livres):
-                return horarios_livres[indice]
-            else:
-                print(f"⚠️ Por favor, digite um número entre 1 e {len(horarios_livres)}.")
-        except ValueError:
-            print("⚠️ Por favor, digite apenas o número correspondente ao horário.")
-
-
-def processar_agendamento():
-    """Processa o fluxo de agendamento usando o SQLite"""
-    if not esta_em_horario_comercial():
-        print("⏰ Nosso atendimento é das 8h às 17h. Por favor, envie mensagem nesse horário.")
-        return
-
-    resposta = input("Gostaria de agendar um horário? (Sim/Não): ").strip().lower()
-    if resposta != "sim":
-        print("😊 Tudo bem! Quando quiser agendar, estou aqui para ajudar!")
-        return
-
-    # Coleta informações do cliente
-    nome_cliente = input("Qual é o seu nome? ").strip()
-    numero_cliente = input("Qual é o seu número de telefone? ").strip()
-
-    # Seleciona colaboradora
-    print(f"Profissionais disponíveis: {', '.join(COLABORADORAS)}")
-    while True:
-        colaboradora = input("Com qual profissional deseja agendar? ").strip().title()
-        if colaboradora in COLABORADORAS:
-            break
-        print("⚠️ Não encontramos essa profissional em nossa equipe. Por favor, escolha entre as disponíveis.")
-
-    # Seleciona serviço com verificação de escopo e tratamento para indecisão
-    while True:
-        servico = input("Qual serviço você deseja? (Somente serviços de cabelo ou unhas): ").strip()
-
-        if "não sei" in servico.lower() or "indecisa" in servico.lower():
+    A consulta usa apenas o índice (data, colaboradora, horario); a ocupação de cada
+    profissional é montada como um bitmap sobre HORARIOS_DISPONIVEIS.
+    """
+    conexao = conectar_bd()
+    data = data or datetime.now().strftime("%Y-%m-%d")
+    colaboradoras = colaboradoras or COLABORADORAS
+    ocupacao = dict.fromkeys(colaboradoras, 0)
+    for colaboradora, horario in conexao.execute(
+        "SELECT colaboradora, horario FROM agendamentos WHERE data = ?", (data,)
+    ):
+        bit = _BIT_HORARIO.get(horario)
+        if bit is not None and colaboradora in ocupacao:
+            ocupacao[colaboradora] |= bit
+    return {
+        colaboradora: [h for h in HORARIOS_DISPONIVEIS if not bits & _BIT_HORARIO[h]]
+        for colaboradora, bits in ocupacao.items()
+    }
+
+@METRICAS.cronometrar_funcao("bella_agenda_busca_segundos")
+def buscar_proximos_horarios(quantidade=5, dias=DIAS_BUSCA_HORARIOS, colaboradoras=None):
+    """Próximos horários livres [(data, colaboradora, horário)] a partir de agora, em vários dias
+
+    A busca é feita no CALENDARIO em memória; o banco só é consultado de novo quando
+    outra conexão alterou os agendamentos. A reserva em registrar_agendamento_sqlite
+    continua sendo a verificação definitiva.
+    """
+    agora = datetime.now()
+    CALENDARIO.sincronizar(conectar_bd(), agora.strftime("%Y-%m-%d"))
+    return CALENDARIO.proximos_livres(quantidade, dias, agora.date(), colaboradoras, agora.strftime("%H:%M"))
+
+
+def texto_menu():
+    """Monta o menu principal do bot"""
+    return (f"\n💬 Olá, eu sou a Bella! ✨ Seja bem-vinda ao {NOME_SALAO}!\n"
+            "Especializada em serviços de cabelo e unhas.\n"
+            "Como posso ajudar você hoje?\n"
+            "1️⃣ Agendar horário\n"
+            "2️⃣ Sugestões e dúvidas sobre cabelos e unhas\n"
+            "3️⃣ Falar com uma atendente\n"
+            "0️⃣ Sair\n"
+            "\nDigite o número da opção desejada:")
+
+
+def texto_horarios_disponiveis(horarios_livres):
+    """Monta a lista de horários disponíveis numerados para seleção"""
+    linhas = ["\n🕒 Horários disponíveis:"]
+    linhas += [f"{i}. {horario}" for i, horario in enumerate(horarios_livres, 1)]
+    linhas.append("\nDigite o número do horário desejado:")
+    return "\n".join(linhas)
+
+
+def texto_data(data):
+    """Data AAAA-MM-DD como dd/mm com o dia da semana, ex: 21/10 (ter)"""
+    dia = datetime.strptime(data, "%Y-%m-%d")
+    return f"{dia:%d/%m} ({DIAS_SEMANA[dia.weekday()]})"
+
+
+def texto_proximos_horarios(opcoes):
+    """Monta a lista numerada de (data, colaboradora, horário) em vários dias"""
+    linhas = ["\n📅 Próximos horários livres:"]
+    linhas += [f"{i}. {texto_data(data)} às {horario} com {colaboradora}"
+               for i, (data, colaboradora, horario) in enumerate(opcoes, 1)]
+    linhas.append("\nDigite o número do horário desejado:")
+    return "\n".join(linhas)
+
+
+MENSAGEM_BANCO_OCUPADO = ("⚠️ Nosso sistema de agendamentos está ocupado neste momento. "
+                          "Por favor, envie sua última mensagem de novo em alguns segundos.")
+
+MENSAGEM_FORA_DO_ESCOPO = ("⚠️ Desculpe, como assistente especializada do Bella Beauty Salon, posso ajudar apenas com "
+                           "assuntos relacionados a cabelos e unhas. Poderia reformular sua pergunta?")
+
+
+class ListaRespostas(list):
+    """Respostas a uma mensagem; com `emitir`, cada uma também é repassada assim que fica pronta"""
+
+    def __init__(self, emitir=None):
+        super().__init__()
+        self.emitir = emitir
+
+    def append(self, texto):
+        super().append(texto)
+        if self.emitir:
+            self.emitir(texto + "\n")
+
+    async def transmitir(self, prefixo, trechos):
+        """Consome um gerador de trechos do Gemini, repassando-os um a um, e guarda o texto completo"""
+        if self.emitir:
+            self.emitir(prefixo)
+        partes = []
+        async for trecho in trechos:
+            partes.append(trecho)
+            if self.emitir:
+                self.emitir(trecho)
+        if self.emitir:
+            self.emitir("\n")
+        texto = "".join(partes)
+        super().append(prefixo + texto)
+        return texto
+
+
+class SessaoConversa:
+    """Estado da conversa com uma cliente (uma por número de telefone)"""
+
+    __slots__ = ("telefone", "estado", "dados", "memoria", "ultima_atividade", "encerrada", "_lock")
+
+    def __init__(self, telefone):
+        self.telefone = telefone
+        self.estado = "inicio"
+        self.dados = {}
+        self.memoria = MemoriaConversa()  # Histórico usado como contexto nas consultas ao Gemini
+        self.ultima_atividade = time.monotonic()
+        self.encerrada = False
+        self._lock = None
+
+    @property
+    def lock(self):
+        # Criado sob demanda para pertencer ao event loop que processa as mensagens
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+
+class MotorConversa:
+    """Máquina de estados do atendimento, sem nenhuma entrada/saída de terminal.
+
+    Cada mensagem recebida avança o estado da sessão da cliente e devolve a lista de
+    respostas a enviar. As sessões ficam em memória, indexadas pelo telefone, e são
+    descartadas após `tempo_inativo_max` segundos sem mensagens (ou quando o limite de
+    `max_sessoes` é atingido, começando pela mais antiga).
+    """
+
+    def __init__(self, tempo_inativo_max=30 * 60, max_sessoes=10000):
+        self.tempo_inativo_max = tempo_inativo_max
+        self.max_sessoes = max_sessoes
+        self.sessoes = OrderedDict()  # Da sessão inativa há mais tempo para a mais recente
+        self._tarefas = set()  # Tarefas em segundo plano (condensação do histórico, candidatas ao FAQ)
+
+    def obter_sessao(self, telefone):
+        sessao = self.sessoes.get(telefone)
+        if sessao is None:
+            sessao = self.sessoes[telefone] = SessaoConversa(telefone)
+            while len(self.sessoes) > self.max_sessoes:
+                self.sessoes.popitem(last=False)
+        else:
+            self.sessoes.move_to_end(telefone)
+        sessao.ultima_atividade = time.monotonic()
+        return sessao
+
+    def remover_inativas(self):
+        """Descarta as sessões sem atividade há mais de `tempo_inativo_max` segundos"""
+        limite = time.monotonic() - self.tempo_inativo_max
+        removidas = 0
+        while self.sessoes:
+            telefone, sessao = next(iter(self.sessoes.items()))
+            if sessao.ultima_atividade > limite:
+                break
+            del self.sessoes[telefone]
+            removidas += 1
+        return removidas
+
+    async def processar(self, telefone, mensagem, emitir=None):
+        """Processa uma mensagem da cliente e retorna a lista de respostas
+
+        Se `emitir` for informado, ele recebe o texto das respostas assim que fica pronto,
+        inclusive trecho a trecho nas respostas longas do Gemini (streaming).
+        """
+        sessao = self.obter_sessao(telefone)
+        async with sessao.lock:
+            respostas = ListaRespostas(emitir)
+            estado = sessao.estado
+            manipulador = getattr(self, f"_estado_{estado}")
+            with METRICAS.sessao(telefone), METRICAS.cronometrar("bella_mensagem_segundos", estado=estado):
+                try:
+                    await manipulador(sessao, mensagem.strip(), respostas)
+                except sqlite3.OperationalError as erro:
+                    # Lock do SQLite disputado por outro processo além do busy_timeout: a sessão
+                    # continua no mesmo estado e a cliente só precisa repetir a mensagem
+                    if "locked" not in str(erro) and "busy" not in str(erro):
+                        raise
+                    METRICAS.contar("bella_banco_ocupado_total")
+                    respostas.append(MENSAGEM_BANCO_OCUPADO)
+            if sessao.encerrada:
+                self.sessoes.pop(telefone, None)
+            elif CONDENSAR_MEMORIA:
+                self._agendar_condensacao(sessao)
+            return respostas
+
+    def _agendar_condensacao(self, sessao):
+        pendente = sessao.memoria.linhas_para_condensar()
+        if pendente is None:
+            return
+        self._agendar(condensar_memoria(sessao.memoria, *pendente))
+
+    def _agendar(self, corrotina):
+        """Roda a corrotina em segundo plano, sem atrasar a resposta da mensagem atual"""
+        tarefa = asyncio.get_running_loop().create_task(corrotina)
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    def _lembrar(self, sessao, mensagem, resposta):
+        """Guarda a mensagem da cliente e a resposta da Bella no histórico da sessão"""
+        sessao.memoria.registrar("cliente", mensagem)
+        sessao.memoria.registrar("bella", resposta)
+
+    def _ir_para_menu(self, sessao, respostas):
+        sessao.estado = "menu"
+        sessao.dados.clear()
+        respostas.append(texto_menu())
+
+    async def _estado_inicio(self, sessao, mensagem, respostas):
+        respostas.append(f"🏪 Bem-vindo ao sistema de atendimento do {NOME_SALAO}!")
+        self._ir_para_menu(sessao, respostas)
+
+    async def _estado_menu(self, sessao, mensagem, respostas):
+        if mensagem == "1":
+            if not esta_em_horario_comercial():
+                respostas.append("⏰ Nosso atendimento é das 8h às 17h. Por favor, envie mensagem nesse horário.")
+                self._ir_para_menu(sessao, respostas)
+                return
+            sessao.estado = "agendar_confirmar"
+            respostas.append("Gostaria de agendar um horário? (Sim/Não)")
+        elif mensagem == "2":
+            sessao.estado = "sugestoes_menu"
+            respostas.append("\n🌟 Como posso ajudar você com cabelos e unhas hoje?\n"
+                             "1. Sugestões de serviços para você\n"
+                             "2. Tirar dúvidas sobre serviços e cuidados\n"
+                             "0. Voltar ao menu principal\n"
+                             "\nDigite o número da opção desejada:")
+        elif mensagem == "3":
+            respostas.append("📞 Você será redirecionada para uma atendente humana. Por favor, aguarde um momento...")
+            self._ir_para_menu(sessao, respostas)
+        elif mensagem == "0":
             try:
-                dica = consultar_gemini(
-                    "Uma cliente está indecisa sobre qual serviço escolher entre cabelo e unhas. Sugira 3 opções populares de serviços, explicando brevemente os benefícios de cada um.",
-                    f"Cliente: {nome_cliente}",
-                    verificar_escopo=False
+                mensagem_despedida = await consultar_gemini_async(
+                    "Crie uma mensagem de despedida calorosa e breve para uma cliente do salão de beleza que está encerrando a conversa.",
+                    verificar_escopo=False,
+                    tipo_cache="despedida",
+                    origem="despedida",
+                    telefone=sessao.telefone
                 )
-                print("\n💡 Sugestões para você:\n", dica)
             except Exception:
-                print("\n💡 Sugestões populares para você:")
-                print("1. Hidratação profunda - Restaura a saúde dos fios danificados")
-                print("2. Manicure em gel - Unhas fortes e duradouras por semanas")
-                print("3. Corte repicado - Dá movimento e volume aos cabelos")
-
-            servico = input("\nQual serviço você gostaria de agendar? ").strip()
+                mensagem_despedida = "Muito obrigada por conversar conosco! Esperamos vê-la em breve no Bella Beauty Salon. Tenha um dia maravilhoso!"
+            respostas.append(f"\n👋 {mensagem_despedida}")
+            sessao.encerrada = True
+        else:
+            respostas.append("❌ Opção inválida. Por favor, escolha uma das opções disponíveis.")
+            self._ir_para_menu(sessao, respostas)
 
-            # Verifica novamente se o serviço escolhido está no escopo
-            if not verificar_topico_permitido(servico):
-                print("⚠️ Desculpe, nosso salão oferece apenas serviços de cabelo e unhas.")
-                continue
+    # Fluxo de agendamento
 
-        # Se chegou aqui, o serviço está no escopo
-        break
+    async def _estado_agendar_confirmar(self, sessao, mensagem, respostas):
+        if mensagem.lower() != "sim":
+            respostas.append("😊 Tudo bem! Quando quiser agendar, estou aqui para ajudar!")
+            self._ir_para_menu(sessao, respostas)
+            return
+        sessao.estado = "agendar_nome"
+        respostas.append("Qual é o seu nome?")
+
+    async def _estado_agendar_nome(self, sessao, mensagem, respostas):
+        sessao.dados["nome_cliente"] = mensagem
+        sessao.estado = "agendar_telefone"
+        respostas.append("Qual é o seu número de telefone?")
+
+    async def _estado_agendar_telefone(self, sessao, mensagem, respostas):
+        sessao.dados["numero_cliente"] = mensagem
+        sessao.estado = "agendar_colaboradora"
+        respostas.append(f"Profissionais disponíveis: {', '.join(COLABORADORAS)}")
+        respostas.append("Com qual profissional deseja agendar?")
+
+    async def _estado_agendar_colaboradora(self, sessao, mensagem, respostas):
+        colaboradora = mensagem.title()
+        if colaboradora not in COLABORADORAS:
+            respostas.append("⚠️ Não encontramos essa profissional em nossa equipe. Por favor, escolha entre as disponíveis.")
+            respostas.append("Com qual profissional deseja agendar?")
+            return
+        sessao.dados["colaboradora"] = colaboradora
+        sessao.estado = "agendar_servico"
+        respostas.append("Qual serviço você deseja? (Somente serviços de cabelo ou unhas)")
 
-    # Verifica horários disponíveis no banco de dados SQLite
-    horarios_ocupados = obter_horarios_ocupados_sqlite()
-    horarios_livres = [h for h in HORARIOS_DISPONIVEIS if h not in horarios_ocupados]
+    async def _estado_agendar_servico(self, sessao, mensagem, respostas):
+        if "não sei" in mensagem.lower() or "indecisa" in mensagem.lower():
+            try:
+                prompt_indecisa = "Uma cliente está indecisa sobre qual serviço escolher entre cabelo e unhas. Sugira 3 opções populares de serviços, explicando brevemente os benefícios de cada um."
+                # Sem o nome da cliente: a resposta vai para o cache e serve a todas as indecisas
+                dica = await consultar_gemini_async(
+                    prompt_indecisa,
+                    verificar_escopo=False,
+                    tipo_cache="sugestao_indecisa",
+                    chave_cache=prompt_indecisa,
+                    origem="sugestao_indecisa",
+                    telefone=sessao.telefone
+                )
+                respostas.append(f"\n💡 Sugestões para você:\n {dica}")
+            except Exception:
+                respostas.append("\n💡 Sugestões populares para você:\n"
+                                 "1. Hidratação profunda - Restaura a saúde dos fios danificados\n"
+                                 "2. Manicure em gel - Unhas fortes e duradouras por semanas\n"
+                                 "3. Corte repicado - Dá movimento e volume aos cabelos")
+            sessao.estado = "agendar_servico_apos_dica"
+            respostas.append("\nQual serviço você gostaria de agendar?")
+            return
+        await self._oferecer_horarios(sessao, mensagem, respostas)
+
+    async def _estado_agendar_servico_apos_dica(self, sessao, mensagem, respostas):
+        # Verifica novamente se o serviço escolhido está no escopo
+        if not verificar_topico_permitido(mensagem):
+            respostas.append("⚠️ Desculpe, nosso salão oferece apenas serviços de cabelo e unhas.")
+            sessao.estado = "agendar_servico"
+            respostas.append("Qual serviço você deseja? (Somente serviços de cabelo ou unhas)")
+            return
+        await self._oferecer_horarios(sessao, mensagem, respostas)
+
+    async def _oferecer_horarios(self, sessao, servico, respostas):
+        sessao.dados["servico"] = servico
+
+        # Verifica os horários livres da profissional escolhida no dia de hoje (na jornada e ainda por vir)
+        colaboradora = sessao.dados["colaboradora"]
+        data = datetime.now().strftime("%Y-%m-%d")
+        horarios_livres = []
+        if horarios_reservaveis(data, colaboradora, HORARIOS_DISPONIVEIS):
+            # As funções *_sqlite rodam em outra thread: a espera por um lock não trava o event loop
+            livres = (await asyncio.to_thread(obter_horarios_livres_sqlite, data, [colaboradora]))[colaboradora]
+            horarios_livres = horarios_reservaveis(data, colaboradora, livres)
+
+        if not horarios_livres:
+            await self._oferecer_proximos_dias(sessao, respostas, f"⚠️ Não há horários livres hoje com {colaboradora}.")
+            return
 
-    if not horarios_livres:
-        print("⚠️ Todos os horários de hoje estão ocupados. Podemos verificar disponibilidade para amanhã!")
-        return
+        sessao.dados["opcoes"] = [(data, colaboradora, horario) for horario in horarios_livres]
+        sessao.estado = "agendar_horario"
+        respostas.append(texto_horarios_disponiveis(horarios_livres))
+
+    async def _oferecer_proximos_dias(self, sessao, respostas, aviso):
+        """Oferece os próximos horários livres nos outros dias (da mesma profissional ou, se não houver, de qualquer uma)"""
+        colaboradora = sessao.dados["colaboradora"]
+        opcoes = (await asyncio.to_thread(buscar_proximos_horarios, colaboradoras=[colaboradora])
+                  or await asyncio.to_thread(buscar_proximos_horarios))
+        if not opcoes:
+            respostas.append(f"{aviso} Não há horários livres nos próximos {DIAS_BUSCA_HORARIOS} dias. "
+                             "Fale com uma atendente (opção 3) para entrar na lista de espera.")
+            self._ir_para_menu(sessao, respostas)
+            return
+        sessao.dados["opcoes"] = opcoes
+        sessao.estado = "agendar_horario"
+        respostas.append(aviso)
+        respostas.append(texto_proximos_horarios(opcoes))
 
-    horario = selecionar_horario(horarios_livres)
+    async def _estado_agendar_horario(self, sessao, mensagem, respostas):
+        opcoes = sessao.dados["opcoes"]
+        try:
+            indice = int(mensagem) - 1
+        except ValueError:
+            respostas.append("⚠️ Por favor, digite apenas o número correspondente ao horário.")
+            return
+        if not 0 <= indice < len(opcoes):
+            respostas.append(f"⚠️ Por favor, digite um número entre 1 e {len(opcoes)}.")
+            return
 
-    # Confirma agendamento e salva no banco de dados SQLite
-    registrar_agendamento_sqlite(nome_cliente, numero_cliente, colaboradora, servico, horario)
+        data, colaboradora, horario = opcoes[indice]
+        nome_cliente = sessao.dados["nome_cliente"]
+        servico = sessao.dados["servico"]
+        sessao.dados["colaboradora"] = colaboradora
 
-    # Mensagem personalizada de confirmação - tente a API primeiro, use fallback se falhar
-    try:
-        confirmacao = consultar_gemini(
-            f"Crie uma mensagem de confirmação de agendamento entusiasmada e personalizada para uma cliente chamada {nome_cliente} que agendou {servico} com {colaboradora} às {horario}. Mantenha a mensagem curta e amigável.",
-            f"Cliente: {nome_cliente}, Serviço: {servico}",
-            verificar_escopo=False
+        # Reserva o horário no banco de dados SQLite (falha se outra sessão chegou antes)
+        reservado, motivo, alternativas = await asyncio.to_thread(
+            registrar_agendamento_sqlite, nome_cliente, sessao.dados["numero_cliente"], colaboradora, servico,
+            horario, data
         )
-    except Exception:
-        confirmacao = f"Agendamento confirmado, {nome_cliente}! Seu horário para {servico} com {colaboradora} às {horario} está garantido. Estamos ansiosos para recebê-la no Bella Beauty Salon!"
-
-    print(f"\n✅ {confirmacao}")
-
-
-def sugestoes_e_duvidas():
-    """Função unificada para lidar com sugestões e dúvidas"""
-    print("\n🌟 Como posso ajudar você com cabelos e unhas hoje?")
-    print("1. Sugestões de serviços para você")
-    print("2. Tirar dúvidas sobre serviços e cuidados")
-    print("0. Voltar ao menu principal")
-
-    escolha = input("\nDigite o número da opção desejada: ").strip()
-
-    if escolha == "1":
-        obter_sugestoes()
-    elif escolha == "2":
-        responder_duvidas()
-    elif escolha == "0":
-        return
-    else:
-        print("❌ Opção inválida. Por favor, escolha uma das opções disponíveis.")
-
-
-def obter_sugestoes():
-    """Solicita sugestões de serviços com base nas preferências do cliente"""
-    print("🔎 Vamos encontrar o serviço perfeito para você...")
-
-    gosto = input("Por favor, conte-me um pouco sobre o que você está procurando para cabelo ou unhas "
-                 "(ex: 'meu cabelo está danificado', 'minhas unhas quebram facilmente'): ").strip()
-
-    if not gosto:
-        print("⚠️ Para que eu possa sugerir o melhor serviço,preciso saber um pouco mais sobre o que você procura.")
-        return
-
-    # Verifica se o tema está dentro do escopo
-    if not verificar_topico_permitido(gosto):
-        print("⚠️ Desculpe, como assistente especializada do Bella Beauty Salon, posso ajudar apenas com "
-              "assuntos relacionados a cabelos e unhas. Poderia reformular sua pergunta?")
-        return
+        if not reservado:
+            if motivo == "ocupado":
+                respostas.append(f"⚠️ Que pena! O horário das {horario} com {colaboradora} acabou de ser reservado por outra cliente.")
+            else:
+                respostas.append(f"⚠️ O horário das {horario} com {colaboradora} não está mais disponível para agendamento.")
+            if colaboradora in alternativas:
+                sessao.dados["opcoes"] = [(data, colaboradora, livre) for livre in alternativas[colaboradora]]
+                if data == datetime.now().strftime("%Y-%m-%d"):
+                    respostas.append(texto_horarios_disponiveis(alternativas[colaboradora]))
+                else:
+                    respostas.append(texto_proximos_horarios(sessao.dados["opcoes"]))
+                return
+            await self._oferecer_proximos_dias(sessao, respostas, f"{colaboradora} não tem mais horários nesse dia.")
+            return
 
-    prompt = f"Uma cliente do salão de beleza compartilhou a seguinte necessidade/situação: '{gosto}'. " \
-             f"Sugira 2-3 serviços específicos do nosso salão (APENAS para cabelo ou unhas) que seriam ideais para ela, explicando brevemente por que cada um " \
-             f"seria benéfico no caso dela. Seja específica, acolhedora e demonstre conhecimento técnico de beleza."
+        quando = f"às {horario}"
+        if data != datetime.now().strftime("%Y-%m-%d"):
+            quando = f"em {texto_data(data)} {quando}"
 
-    try:
-        sugestao = consultar_gemini(prompt, verificar_escopo=False)
-        print("\n✨ Recomendações personalizadas para você:\n", sugestao)
-    except Exception:
-        # Resposta fallback baseada em palavras-chave simples no input
-        print("\n✨ Com base no que você mencionou, aqui estão algumas recomendações:")
-        if "danificado" in gosto.lower() or "seco" in gosto.lower() or "quebr" in gosto.lower():
-            if "cabelo" in gosto.lower():
-                print("1. Tratamento de hidratação profunda - Ideal para restaurar a saúde de cabelos danificados")
-                print("2. Reconstrução capilar - Repõe nutrientes e fortalece a estrutura do fio")
-                print("3. Corte das pontas - Remove as partes mais danificadas para um visual mais saudável")
-            elif "unha" in gosto.lower():
-                print("1. Tratamento fortalecedor para unhas - Ajuda a reparar unhas quebradiças")
-                print("2. Manicure em gel - Proporciona proteção adicional para unhas frágeis")
-                print("3. Hidratação intensiva para cutículas - Nutre a região ao redor da unha")
+        # Mensagem personalizada de confirmação - tente a API primeiro, use fallback se falhar
+        try:
+            confirmacao = await consultar_gemini_async(
+                f"Crie uma mensagem de confirmação de agendamento entusiasmada e personalizada para uma cliente chamada {nome_cliente} que agendou {servico} com {colaboradora} {quando}. Mantenha a mensagem curta e amigável.",
+                f"Cliente: {nome_cliente}, Serviço: {servico}",
+                verificar_escopo=False,
+                origem="confirmacao",
+                telefone=sessao.telefone
+            )
+        except Exception:
+            confirmacao = f"Agendamento confirmado, {nome_cliente}! Seu horário para {servico} com {colaboradora} {quando} está garantido. Estamos ansiosos para recebê-la no Bella Beauty Salon!"
+
+        respostas.append(f"\n✅ {confirmacao}")
+        sessao.memoria.registrar("bella", f"Agendamento confirmado: {servico} com {colaboradora} {quando}.")
+        self._ir_para_menu(sessao, respostas)
+
+    # Fluxo de sugestões e dúvidas
+
+    async def _estado_sugestoes_menu(self, sessao, mensagem, respostas):
+        if mensagem == "1":
+            sessao.estado = "sugestao"
+            respostas.append("🔎 Vamos encontrar o serviço perfeito para você...")
+            respostas.append("Por favor, conte-me um pouco sobre o que você está procurando para cabelo ou unhas "
+                             "(ex: 'meu cabelo está danificado', 'minhas unhas quebram facilmente'):")
+        elif mensagem == "2":
+            sessao.estado = "duvida"
+            respostas.append("❓ Em que posso ajudar? Sou especialista em cuidados com cabelo e unhas!")
+            respostas.append("Qual é a sua dúvida sobre cabelo ou unhas?")
+        elif mensagem == "0":
+            self._ir_para_menu(sessao, respostas)
         else:
-            print("1. Consulta personalizada com nossas especialistas - Para análise detalhada das suas necessidades")
-            print("2. Pacote de tratamento completo - Cuida de todas as necessidades do seu cabelo ou unhas")
-            print("3. Manutenção regular - Garante resultados duradouros e bem-estar contínuo")
-
+            respostas.append("❌ Opção inválida. Por favor, escolha uma das opções disponíveis.")
+            self._ir_para_menu(sessao, respostas)
+
+    async def _estado_sugestao(self, sessao, mensagem, respostas):
+        gosto = mensagem
+        if not gosto:
+            respostas.append("⚠️ Para que eu possa sugerir o melhor serviço,preciso saber um pouco mais sobre o que você procura.")
+            self._ir_para_menu(sessao, respostas)
+            return
 
-def responder_duvidas():
-    """Responde às dúvidas da cliente sobre os serviços e cuidados com cabelo/unhas"""
-    print("❓ Em que posso ajudar? Sou especialista em cuidados com cabelo e unhas!")
+        # Verifica se o tema está dentro do escopo
+        if not verificar_topico_permitido(gosto):
+            respostas.append(MENSAGEM_FORA_DO_ESCOPO)
+            self._ir_para_menu(sessao, respostas)
+            return
 
-    duvida = input("Qual é a sua dúvida sobre cabelo ou unhas? ").strip()
+        prompt = f"Uma cliente do salão de beleza compartilhou a seguinte necessidade/situação: '{gosto}'. " \
+                 f"Sugira 2-3 serviços específicos do nosso salão (APENAS para cabelo ou unhas) que seriam ideais para ela, explicando brevemente por que cada um " \
+                 f"seria benéfico no caso dela. Seja específica, acolhedora e demonstre conhecimento técnico de beleza."
 
-    if not duvida:
-        print("⚠️ Por favor, faça sua pergunta para que eu possa ajudar.")
-        return
+        local = buscar_resposta_local(gosto, "sugestao")
+        try:
+            if local:
+                resposta = local[1]
+                respostas.append(f"\n✨ Recomendações personalizadas para você:\n {resposta}")
+            else:
+                resposta = await respostas.transmitir(
+                    "\n✨ Recomendações personalizadas para você:\n ",
+                    consultar_gemini_stream_async(prompt, sessao.memoria.contexto(), verificar_escopo=False,
+                                                  tipo_cache="sugestao", origem="sugestao",
+                                                  telefone=sessao.telefone)
+                )
+        except Exception:
+            # Resposta fallback baseada em palavras-chave simples no input
+            linhas = ["\n✨ Com base no que você mencionou, aqui estão algumas recomendações:"]
+            if "danificado" in gosto.lower() or "seco" in gosto.lower() or "quebr" in gosto.lower():
+                if "cabelo" in gosto.lower():
+                    linhas += ["1. Tratamento de hidratação profunda - Ideal para restaurar a saúde de cabelos danificados",
+                               "2. Reconstrução capilar - Repõe nutrientes e fortalece a estrutura do fio",
+                               "3. Corte das pontas - Remove as partes mais danificadas para um visual mais saudável"]
+                elif "unha" in gosto.lower():
+                    linhas += ["1. Tratamento fortalecedor para unhas - Ajuda a reparar unhas quebradiças",
+                               "2. Manicure em gel - Proporciona proteção adicional para unhas frágeis",
+                               "3. Hidratação intensiva para cutículas - Nutre a região ao redor da unha"]
+            else:
+                linhas += ["1. Consulta personalizada com nossas especialistas - Para análise detalhada das suas necessidades",
+                           "2. Pacote de tratamento completo - Cuida de todas as necessidades do seu cabelo ou unhas",
+                           "3. Manutenção regular - Garante resultados duradouros e bem-estar contínuo"]
+            resposta = "\n".join(linhas)
+            respostas.append(resposta)
+        self._lembrar(sessao, gosto, resposta)
+        self._ir_para_menu(sessao, respostas)
+
+    async def _estado_duvida(self, sessao, mensagem, respostas):
+        duvida = mensagem
+        if not duvida:
+            respostas.append("⚠️ Por favor, faça sua pergunta para que eu possa ajudar.")
+            self._ir_para_menu(sessao, respostas)
+            return
 
-    # Verifica se a dúvida está dentro do escopo
-    if not verificar_topico_permitido(duvida):
-        print("⚠️ Desculpe, como assistente especializada do Bella Beauty Salon, posso ajudar apenas com "
-              "assuntos relacionados a cabelos e unhas. Poderia reformular sua pergunta?")
-        return
+        # Verifica se a dúvida está dentro do escopo
+        if not verificar_topico_permitido(duvida):
+            respostas.append(MENSAGEM_FORA_DO_ESCOPO)
+            self._ir_para_menu(sessao, respostas)
+            return
 
-    prompt = f"Uma cliente do salão de beleza tem a seguinte dúvida: '{duvida}'. " \
-             f"Responda de forma completa, educada e informativa, demonstrando conhecimento técnico sobre tratamentos " \
-             f"de beleza e cuidados com cabelo e unhas. Use linguagem acessível, mas técnica quando necessário. " \
-             f"Forneça informações práticas e úteis. APENAS sugira serviços do nosso salão relacionados a cabelo e unhas " \
-             f"que possam ajudar com a questão dela ou produtos para uso em casa."
+        prompt = f"Uma cliente do salão de beleza tem a seguinte dúvida: '{duvida}'. " \
+                 f"Responda de forma completa, educada e informativa, demonstrando conhecimento técnico sobre tratamentos " \
+                 f"de beleza e cuidados com cabelo e unhas. Use linguagem acessível, mas técnica quando necessário. " \
+                 f"Forneça informações práticas e úteis. APENAS sugira serviços do nosso salão relacionados a cabelo e unhas " \
+                 f"que possam ajudar com a questão dela ou produtos para uso em casa."
 
-    try:
-        resposta = consultar_gemini(prompt, verificar_escopo=False)
-        print("\n📝 Resposta:", resposta)
-    except Exception:
-        # Resposta fallback genérica
-        print("\n📝 Resposta: Para responder sua pergunta sobre cuidados com cabelo e unhas da melhor forma, recomendamos uma consulta personalizada com uma de nossas especialistas. Cada caso é único e merece atenção especial. Gostaríamos de oferecer um diagnóstico preciso e recomendações específicas para suas necessidades. Podemos agendar um horário para você conversar com uma de nossas profissionais?")
+        local = buscar_resposta_local(duvida, "duvida")
+        try:
+            if local:
+                sessao.dados["faq_id"], resposta = local
+                respostas.append(f"\n📝 Resposta: {resposta}")
+            else:
+                contexto = sessao.memoria.contexto()
+                resposta = await respostas.transmitir(
+                    "\n📝 Resposta: ",
+                    consultar_gemini_stream_async(prompt, contexto, verificar_escopo=False,
+                                                  tipo_cache="duvida", origem="duvida",
+                                                  telefone=sessao.telefone)
+                )
+                if not eh_resposta_fallback(resposta):
+                    # Resposta com o histórico da cliente não vai para o FAQ; se for útil, o FAQ
+                    # recebe uma versão gerada só com a pergunta
+                    if contexto is None:
+                        sessao.dados["resposta"] = resposta
+                    else:
+                        sessao.dados["prompt_faq"] = prompt
+        except Exception:
+            # Resposta fallback genérica
+            resposta = "Para responder sua pergunta sobre cuidados com cabelo e unhas da melhor forma, recomendamos uma consulta personalizada com uma de nossas especialistas. Cada caso é único e merece atenção especial. Gostaríamos de oferecer um diagnóstico preciso e recomendações específicas para suas necessidades. Podemos agendar um horário para você conversar com uma de nossas profissionais?"
+            respostas.append(f"\n📝 Resposta: {resposta}")
+        self._lembrar(sessao, duvida, resposta)
+
+        # Pergunta se a resposta foi útil
+        sessao.dados["duvida"] = duvida
+        sessao.estado = "duvida_util"
+        respostas.append("\nEssa resposta foi útil para você? (Sim/Não)")
+
+    async def _estado_duvida_util(self, sessao, mensagem, respostas):
+        # O feedback decide o que entra (ou sai) do índice de respostas locais
+        util = mensagem.lower() == "sim"
+        faq_id = sessao.dados.pop("faq_id", None)
+        if faq_id is not None:
+            INDICE_FAQ.registrar_voto(faq_id, util, sessao.telefone)
+        elif util and "resposta" in sessao.dados:
+            INDICE_FAQ.sugerir(sessao.dados["duvida"], sessao.dados["resposta"], "duvida", sessao.telefone)
+        elif util and "prompt_faq" in sessao.dados:
+            self._agendar(sugerir_para_faq(sessao.dados["duvida"], sessao.dados["prompt_faq"], sessao.telefone))
+        if util:
+            self._ir_para_menu(sessao, respostas)
+            return
+        sessao.estado = "duvida_mais_info"
+        respostas.append("Por favor, me conte mais detalhes sobre sua dúvida de cabelo ou unhas para que eu possa ajudar melhor:")
 
-    # Pergunta se a resposta foi útil
-    util = input("\nEssa resposta foi útil para você? (Sim/Não): ").strip().lower()
-    if util != "sim":
-        mais_info = input("Por favor, me conte mais detalhes sobre sua dúvida de cabelo ou unhas para que eu possa ajudar melhor: ").strip()
+    async def _estado_duvida_mais_info(self, sessao, mensagem, respostas):
+        mais_info = mensagem
+        duvida = sessao.dados["duvida"]
 
         # Verifica novamente se está dentro do escopo
         if not verificar_topico_permitido(mais_info):
-            print("⚠️ Desculpe, como assistente especializada do Bella Beauty Salon, posso ajudar apenas com "
-                  "assuntos relacionados a cabelos e unhas. Poderia reformular sua pergunta?")
+            respostas.append(MENSAGEM_FORA_DO_ESCOPO)
+            self._ir_para_menu(sessao, respostas)
             return
 
-        if mais_info:
-            contexto = f"A cliente não ficou satisfeita com a resposta anterior sobre: '{duvida}'. " \
-                      f"Ela adicionou as seguintes informações: '{mais_info}'. " \
-                      f"Por favor, forneça uma resposta mais direcionada e específica, usando seu conhecimento especializado em cuidados com cabelo e unhas."
+        # A resposta anterior já está no histórico da sessão, enviado como contexto
+        prompt = f"A cliente não ficou satisfeita com a resposta anterior sobre: '{duvida}'. " \
+                 f"Ela adicionou as seguintes informações: '{mais_info}'. " \
+                 f"Por favor, forneça uma resposta mais direcionada e específica, usando seu conhecimento especializado em cuidados com cabelo e unhas."
+
+        try:
+            resposta = await respostas.transmitir(
+                "\n📝 Resposta atualizada: ",
+                consultar_gemini_stream_async(prompt, sessao.memoria.contexto(), verificar_escopo=False,
+                                              origem="duvida", telefone=sessao.telefone)
+            )
+        except Exception:
+            resposta = "Entendo melhor sua situação agora. Com base nesses detalhes, recomendamos que agende uma consulta com uma de nossas especialistas que poderá avaliar presencialmente e oferecer o tratamento mais adequado. Se preferir, podemos oferecer algumas dicas iniciais por telefone com uma de nossas profissionais. Gostaria de agendar um horário para atendimento personalizado?"
+            respostas.append(f"\n📝 Resposta atualizada: {resposta}")
+        self._lembrar(sessao, mais_info, resposta)
+        self._ir_para_menu(sessao, respostas)
 
-            try:
-                nova_resposta = consultar_gemini(contexto, verificar_escopo=False)
-                print("\n📝 Resposta atualizada:", nova_resposta)
-            except Exception:
-                print("\n📝 Resposta atualizada: Entendo melhor sua situação agora. Com base nesses detalhes, recomendamos que agende uma consulta com uma de nossas especialistas que poderá avaliar presencialmente e oferecer o tratamento mais adequado. Se preferir, podemos oferecer algumas dicas iniciais por telefone com uma de nossas profissionais. Gostaria de agendar um horário para atendimento personalizado?")
+
+# Motor compartilhado pelas interfaces (terminal e servidor de webhook)
+MOTOR_CONVERSA = MotorConversa()
 
 
 def verificar_api_key():
@@ -433,42 +1199,33 @@ def verificar_api_key():
 
 
 def main():
-    """Função principal do programa"""
+    """Atendimento pelo terminal: uma única sessão conduzida via input()/print()"""
     if not verificar_api_key():
         return
 
     # Cria a tabela de agendamentos no SQLite se não existir
     criar_tabela_agendamentos_sqlite()
 
-    print(f"🏪 Bem-vindo ao sistema de atendimento do {NOME_SALAO}!")
-
-    while True:
-        exibir_menu()
-        escolha = input("\nDigite o número da opção desejada: ").strip()
+    def emitir(texto):
+        print(texto, end="", flush=True)
 
-        if escolha == "1":
-            processar_agendamento()
-        elif escolha == "2":
-            sugestoes_e_duvidas()
-        elif escolha == "3":
-            print("📞 Você será redirecionada para uma atendente humana. Por favor, aguarde um momento...")
-        elif escolha == "0":
-            try:
-                mensagem_despedida = consultar_gemini(
-                    "Crie uma mensagem de despedida calorosa e breve para uma cliente do salão de beleza que está encerrando a conversa.",
-                    verificar_escopo=False
-                )
-            except Exception:
-                mensagem_despedida = "Muito obrigada por conversar conosco! Esperamos vê-la em breve no Bella Beauty Salon. Tenha um dia maravilhoso!"
-
-            print(f"\n👋 {mensagem_despedida}")
-            break
-        else:
-            print("❌ Opção inválida. Por favor, escolha uma das opções disponíveis.")
+    telefone = "terminal"
+    mensagem = ""
+    try:
+        while True:
+            # As respostas são impressas por emitir() à medida que ficam prontas (streaming)
+            corotina = MOTOR_CONVERSA.processar(telefone, mensagem, emitir)
+            asyncio.run_coroutine_threadsafe(corotina, _obter_loop_gemini()).result()
+            if telefone not in MOTOR_CONVERSA.sessoes:
+                break
+            mensagem = input("> ")
+    finally:
+        # BELLA_METRICAS_ARQUIVO: grava as métricas da sessão ao sair
+        arquivo_metricas = os.getenv("BELLA_METRICAS_ARQUIVO")
+        if METRICAS.ativo and arquivo_metricas:
+            METRICAS.despejar(arquivo_metricas)
+            print(f"📊 Métricas gravadas em {arquivo_metricas}")
 
 
 if __name__ == "__main__":
     main()
-
-
-
@@ -0,0 +1,106 @@
+"""Benchmark da busca dos próximos horários livres em vários dias.
+
+Preenche a agenda dos próximos dias quase toda (sobra um horário a cada poucos dias)
+e compara a busca dia a dia no banco (obter_horarios_livres_sqlite para cada data) com
+buscar_proximos_horarios, que consulta o calendário de ocupação em memória. No fim,
+confere que o calendário acompanha agendamentos e cancelamentos, inclusive os feitos
+por outra conexão.
+
+Uso: python bench_agenda.py [dias] [dias_entre_vagas]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import bella
+from armazenamento import BancoDados
+
+REPETICOES = 200
+
+
+def medir(funcao, repeticoes=REPETICOES):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def preencher(dias, dias_entre_vagas):
+    """Lota os próximos `dias`, deixando o último horário de Carla livre a cada `dias_entre_vagas` dias"""
+    hoje = date.today()
+    linhas = []
+    for deslocamento in range(dias):
+        data = (hoje + timedelta(days=deslocamento)).isoformat()
+        for colaboradora in bella.COLABORADORAS:
+            for horario in bella.HORARIOS_DISPONIVEIS:
+                vaga = (deslocamento % dias_entre_vagas == dias_entre_vagas - 1 and colaboradora == "Carla"
+                        and horario == bella.HORARIOS_DISPONIVEIS[-1])
+                if not vaga:
+                    linhas.append(("01/01/2000 10:00", "Cliente", "0", colaboradora, "Corte", horario, data))
+    with bella.BANCO.transacao() as conexao:
+        conexao.executemany("""
+            INSERT INTO agendamentos (timestamp, nome_cliente, telefone, colaboradora, servico, horario, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, linhas)
+    return len(linhas)
+
+
+def busca_dia_a_dia(dias, quantidade=5):
+    """A alternativa sem calendário: uma consulta ao banco por dia até achar `quantidade` horários"""
+    encontrados = []
+    hoje = date.today()
+    for deslocamento in range(dias):
+        data = (hoje + timedelta(days=deslocamento)).isoformat()
+        if (hoje + timedelta(days=deslocamento)).weekday() not in bella.DIAS_FUNCIONAMENTO:
+            continue
+        for colaboradora, livres in bella.obter_horarios_livres_sqlite(data).items():
+            encontrados += [(data, colaboradora, horario) for horario in livres]
+        if len(encontrados) >= quantidade:
+            break
+    return encontrados[:quantidade]
+
+
+def main():
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    dias_entre_vagas = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    pasta = tempfile.mkdtemp()
+    bella.BANCO = BancoDados(os.path.join(pasta, "bench.db"))
+    bella.criar_tabela_agendamentos_sqlite()
+    bella.METRICAS.ativo = False
+    total = preencher(dias + 10, dias_entre_vagas)
+    print(f"📅 {total} agendamentos nos próximos {dias + 10} dias, uma vaga a cada {dias_entre_vagas} dias")
+
+    inicio = time.perf_counter()
+    bella.buscar_proximos_horarios(dias=dias)
+    print(f"   carga inicial do calendário: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+    print(f"{'busca':<34} {'ms/busca':>9}")
+    print(f"{'dia a dia no banco (5 vagas)':<34} {medir(lambda: busca_dia_a_dia(dias)):>9.3f}")
+    print(f"{'calendário (5 vagas)':<34} {medir(lambda: bella.buscar_proximos_horarios(5, dias)):>9.3f}")
+    print(f"{'calendário (dias sem nenhuma vaga)':<34} "
+          f"{medir(lambda: bella.buscar_proximos_horarios(5, dias, ['Ana'])):>9.3f}")
+
+    # O calendário acompanha agendamentos e cancelamentos
+    horizonte = dias * 2
+    vaga = bella.buscar_proximos_horarios(1, horizonte)[0]
+    data, colaboradora, horario = vaga
+    reservado, _, _ = bella.registrar_agendamento_sqlite("Teste", "1", colaboradora, "Corte", horario, data)
+    assert reservado and vaga not in bella.buscar_proximos_horarios(50, horizonte)
+    assert bella.cancelar_agendamento_sqlite(data, colaboradora, horario)
+    assert bella.buscar_proximos_horarios(1, horizonte)[0] == vaga
+
+    # ...e percebe gravações de outra conexão (como a de outro processo)
+    outra = BancoDados(bella.BANCO.arquivo)
+    with outra.transacao() as conexao:
+        conexao.execute("""
+            INSERT INTO agendamentos (timestamp, nome_cliente, telefone, colaboradora, servico, horario, data)
+            VALUES (?, 'Externa', '2', ?, 'Corte', ?, ?)
+        """, (datetime.now().strftime("%d/%m/%Y %H:%M"), colaboradora, horario, data))
+    assert vaga not in bella.buscar_proximos_horarios(50, horizonte)
+    print("✅ Calendário sincronizado com agendamentos, cancelamentos e outras conexões")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Teste de carga do atendimento com o Gemini simulado e clientes concorrentes.
+
+Sobe o mock_gemini.py (latência, taxa de 503 e streaming configuráveis), aponta o bot
+para ele e conduz conversas roteirizadas pelos fluxos de agendamento, sugestão e
+dúvidas — as mesmas mensagens aceitas pelo main() — com N clientes simultâneas,
+distribuídas em P processos que compartilham o mesmo banco SQLite (como vários
+workers do servidor_webhook.py).
+
+Mede vazão, latência de ponta a ponta por mensagem (p50/p95/p99), tempo gasto nas
+funções *_sqlite (disputa pelo banco), conflitos de reserva e taxa de fallback, e grava
+tudo em JSON para comparar execuções (--comparar execucao_anterior.json).
+
+Uso: python bench_carga.py [--clientes 50] [--processos 2] [--conversas 5] [--latencia-ms 300]
+                           [--taxa-503 0.05] [--saida bench_carga.json] [--comparar anterior.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import bella
+from armazenamento import BancoDados
+from cache_respostas import CacheRespostas
+from escalonador import EscalonadorGemini
+from indice_faq import IndiceFAQ
+from mock_gemini import ServidorGeminiFalso
+
+RESPOSTA_SIMULADA = (
+    "Para esse caso recomendamos uma hidratação profunda no salão, seguida de um cronograma capilar "
+    "em casa. Nossa equipe pode avaliar seus fios e indicar o tratamento ideal para você."
+)
+SERVICOS = ["corte de cabelo", "escova", "manicure", "pedicure", "hidratação capilar", "coloração do cabelo"]
+NECESSIDADES = ["meu cabelo está danificado", "minhas unhas quebram facilmente", "cabelo seco e sem brilho",
+                "quero mudar a cor do cabelo", "unhas fracas e descascando"]
+DUVIDAS = ["como cuidar de cabelo cacheado?", "quanto tempo dura a escova progressiva?",
+           "esmalte em gel estraga a unha?", "qual a diferença entre hidratação e nutrição capilar?",
+           "como evitar pontas duplas no cabelo?"]
+
+
+def percentis(valores):
+    """p50/p95/p99/máximo em milissegundos"""
+    if not valores:
+        return {"amostras": 0}
+    ordenados = sorted(valores)
+    if len(ordenados) > 1:
+        cortes = statistics.quantiles(ordenados, n=100, method="inclusive")
+        p50, p95, p99 = cortes[49], cortes[94], cortes[98]
+    else:
+        p50 = p95 = p99 = ordenados[0]
+    return {"amostras": len(ordenados), "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000,
+            "max_ms": ordenados[-1] * 1000, "media_ms": statistics.fmean(ordenados) * 1000}
+
+
+def percentis_histograma(histograma):
+    """p50/p95/p99 estimados por interpolação dentro dos baldes (como o histogram_quantile do Prometheus)"""
+    total = histograma["total"]
+    if not total:
+        return {"amostras": 0}
+
+    def quantil(q):
+        alvo = q * total
+        acumulado, inferior = 0, 0.0
+        for limite, contagem in zip(histograma["baldes"], histograma["contagens"]):
+            if contagem and acumulado + contagem >= alvo:
+                return inferior + (limite - inferior) * (alvo - acumulado) / contagem
+            acumulado += contagem
+            inferior = limite
+        return inferior  # Acima do último balde: só se sabe o limite inferior
+
+    return {"amostras": total, "p50_ms": quantil(0.50) * 1000, "p95_ms": quantil(0.95) * 1000,
+            "p99_ms": quantil(0.99) * 1000, "media_ms": histograma["soma"] / total * 1000}
+
+
+def somar_histogramas(destino, histograma):
+    if destino is None:
+        return {"baldes": histograma["baldes"], "contagens": list(histograma["contagens"]),
+                "soma": histograma["soma"], "total": histograma["total"]}
+    destino["contagens"] = [a + b for a, b in zip(destino["contagens"], histograma["contagens"])]
+    destino["soma"] += histograma["soma"]
+    destino["total"] += histograma["total"]
+    return destino
+
+
+class ClienteSimulada:
+    """Uma cliente conversando com o MotorConversa, mensagem a mensagem"""
+
+    def __init__(self, telefone, sorteio, resultados, pausa):
+        self.telefone = telefone
+        self.sorteio = sorteio
+        self.resultados = resultados
+        self.pausa = pausa
+        self.fluxo = None
+
+    async def enviar(self, mensagem):
+        if self.pausa:
+            await asyncio.sleep(self.sorteio.uniform(0, 2 * self.pausa))
+        inicio = time.perf_counter()
+        try:
+            respostas = await bella.MOTOR_CONVERSA.processar(self.telefone, mensagem)
+        except Exception as e:
+            self.resultados["erros"].append(f"{type(e).__name__}: {e}")
+            raise
+        duracao = time.perf_counter() - inicio
+        self.resultados["mensagens"].append(duracao)
+        self.resultados["por_fluxo"].setdefault(self.fluxo, []).append(duracao)
+        return "".join(respostas)
+
+    async def agendamento(self):
+        await self.enviar("oi")
+        await self.enviar("1")
+        await self.enviar("sim")
+        await self.enviar(f"Cliente {self.telefone}")
+        await self.enviar(self.telefone)
+        await self.enviar(self.sorteio.choice(bella.COLABORADORAS))
+        texto = await self.enviar(self.sorteio.choice(SERVICOS))
+        reservas = self.resultados["reservas"]
+        for _ in range(len(bella.HORARIOS_DISPONIVEIS) + 1):
+            if "Horários disponíveis" not in texto and "Próximos horários livres" not in texto:
+                reservas["lotado"] += 1
+                break
+            texto = await self.enviar("1")
+            if "✅" in texto:
+                reservas["confirmadas"] += 1
+                break
+            if "acabou de ser reservado" in texto:
+                reservas["conflitos"] += 1
+        await self.enviar("0")
+
+    async def sugestao(self):
+        await self.enviar("oi")
+        await self.enviar("2")
+        await self.enviar("1")
+        await self.enviar(self.sorteio.choice(NECESSIDADES))
+        await self.enviar("0")
+
+    async def duvida(self):
+        await self.enviar("oi")
+        await self.enviar("2")
+        await self.enviar("2")
+        await self.enviar(self.sorteio.choice(DUVIDAS))
+        if self.sorteio.random() < 0.5:
+            await self.enviar("sim")
+        else:
+            await self.enviar("não")
+            await self.enviar("tenho o cabelo fino e oleoso na raiz")
+        await self.enviar("0")
+
+    async def conversar(self, fluxos, pesos, conversas):
+        for _ in range(conversas):
+            self.fluxo = self.sorteio.choices(fluxos, pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                await getattr(self, self.fluxo)()
+            except Exception:
+                bella.MOTOR_CONVERSA.sessoes.pop(self.telefone, None)
+                continue
+            self.resultados["conversas"].append(time.perf_counter() - inicio)
+
+
+async def _rodar_clientes(config, processo, resultados):
+    fluxos = list(config["mix"])
+    pesos = [config["mix"][fluxo] for fluxo in fluxos]
+    clientes = [
+        ClienteSimulada(f"55{processo:02d}{indice:07d}", random.Random(config["semente"] * 100003 + indice),
+                        resultados, config["pausa_ms"] / 1000)
+        for indice in range(processo, config["clientes"], config["processos"])
+    ]
+    try:
+        await asyncio.gather(*(cliente.conversar(fluxos, pesos, config["conversas"]) for cliente in clientes))
+    finally:
+        await bella.CLIENTE_GEMINI.fechar()
+
+
+def executar_processo(config, processo, url, arquivo, largada, fila):
+    """Worker: um event loop com a sua parte das clientes, como um processo do servidor_webhook.py"""
+    bella.BANCO = BancoDados(arquivo)
+    bella.URL = url
+    bella.CLIENTE_GEMINI.url = url
+    bella.CLIENTE_GEMINI.max_simultaneas = config["max_simultaneas"]
+    bella.CACHE_GEMINI = CacheRespostas(capacidade=0 if config["sem_cache"] else 512)
+    # Índice só em memória, começando vazio; limiar acima de 1 (similaridade máxima) o desliga
+    bella.INDICE_FAQ = IndiceFAQ(limiar=2.0 if config["sem_faq"] else bella.INDICE_FAQ.limiar)
+    bella.ESCALONADOR_GEMINI = EscalonadorGemini(requisicoes_por_minuto=config["rpm"], tokens_por_minuto=config["tpm"],
+                                                 requisicoes_por_telefone=config["limite_cliente"])
+    bella.esta_em_horario_comercial = lambda: True
+    # As funções *_sqlite já são cronometradas em bella_sqlite_segundos; basta ligar as métricas
+    bella.METRICAS.limpar()
+    bella.METRICAS.ativo = True
+    resultados = {"mensagens": [], "por_fluxo": {}, "conversas": [], "erros": [],
+                  "reservas": {"confirmadas": 0, "conflitos": 0, "lotado": 0}}
+
+    largada.wait()
+    inicio = time.time()
+    # Os avisos de nova tentativa do bot poluiriam a saída do benchmark
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        asyncio.run(_rodar_clientes(config, processo, resultados))
+    resultados["inicio"] = inicio
+    resultados["fim"] = time.time()
+    resultados["disjuntor"] = bella.DISJUNTOR_GEMINI.estatisticas()
+    resultados["fila"] = bella.ESCALONADOR_GEMINI.estatisticas()
+    resultados["sqlite"] = {rotulos["funcao"]: histograma
+                            for rotulos, histograma in bella.METRICAS.histogramas("bella_sqlite_segundos")}
+    bella.BANCO.fechar()
+    fila.put(resultados)
+
+
+def consolidar(config, partes, servidor):
+    """Junta os resultados dos processos em um único relatório"""
+    mensagens, conversas, erros = [], [], []
+    por_fluxo, sqlite = {}, {}
+    reservas = {"confirmadas": 0, "conflitos": 0, "lotado": 0}
+    consultas = fallbacks = aberturas = liberadas = 0
+    espera_total = espera_maxima = 0.0
+    descartadas = {}
+    for parte in partes:
+        mensagens += parte["mensagens"]
+        conversas += parte["conversas"]
+        erros += parte["erros"]
+        for fluxo, valores in parte["por_fluxo"].items():
+            por_fluxo.setdefault(fluxo, []).extend(valores)
+        for nome, histograma in parte["sqlite"].items():
+            sqlite[nome] = somar_histogramas(sqlite.get(nome), histograma)
+        for chave in reservas:
+            reservas[chave] += parte["reservas"][chave]
+        consultas += parte["disjuntor"]["consultas"]
+        fallbacks += parte["disjuntor"]["fallbacks"]
+        aberturas += parte["disjuntor"]["aberturas"]
+        liberadas += parte["fila"]["liberadas"]
+        espera_total += parte["fila"]["espera_media"] * parte["fila"]["liberadas"]
+        espera_maxima = max(espera_maxima, parte["fila"]["espera_maxima"])
+        for motivo, quantidade in parte["fila"]["descartadas"].items():
+            descartadas[motivo] = descartadas.get(motivo, 0) + quantidade
+    duracao = max(parte["fim"] for parte in partes) - min(parte["inicio"] for parte in partes)
+    return {
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "duracao_s": duracao,
+        "vazao": {"mensagens_por_s": len(mensagens) / duracao, "conversas_por_s": len(conversas) / duracao},
+        "mensagens": percentis(mensagens),
+        "conversas": percentis(conversas),
+        "por_fluxo": {fluxo: percentis(valores) for fluxo, valores in sorted(por_fluxo.items())},
+        "banco": {
+            "funcoes": {nome: percentis_histograma(histograma) for nome, histograma in sorted(sqlite.items())},
+            "tempo_total_s": sum(histograma["soma"] for histograma in sqlite.values()),
+            "reservas": reservas,
+        },
+        "gemini": {
+            "requisicoes": servidor.requisicoes,
+            "erros_503": servidor.erros,
+            "consultas": consultas,
+            "fallbacks": fallbacks,
+            "taxa_fallback": fallbacks / consultas if consultas else 0.0,
+            "aberturas_disjuntor": aberturas,
+            "fila": {
+                "liberadas": liberadas,
+                "descartadas": descartadas,
+                "espera_media_ms": espera_total / liberadas * 1000 if liberadas else 0.0,
+                "espera_maxima_ms": espera_maxima * 1000,
+            },
+        },
+        "erros": {"total": len(erros), "exemplos": sorted(set(erros))[:5]},
+    }
+
+
+def imprimir(relatorio):
+    config = relatorio["config"]
+    print(f"\n📊 {config['clientes']} clientes x {config['conversas']} conversas em {config['processos']} "
+          f"processo(s), {relatorio['duracao_s']:.1f} s")
+    print(f"   vazão: {relatorio['vazao']['mensagens_por_s']:.1f} mensagens/s, "
+          f"{relatorio['vazao']['conversas_por_s']:.1f} conversas/s")
+
+    def linha(rotulo, p):
+        if p["amostras"]:
+            maximo = f"max {p['max_ms']:8.1f}" if "max_ms" in p else f"méd {p['media_ms']:8.1f}"
+            print(f"   {rotulo:32} n={p['amostras']:6d}  p50 {p['p50_ms']:8.1f}  p95 {p['p95_ms']:8.1f}  "
+                  f"p99 {p['p99_ms']:8.1f}  {maximo} ms")
+
+    linha("mensagem (ponta a ponta)", relatorio["mensagens"])
+    for fluxo, p in relatorio["por_fluxo"].items():
+        linha(f"  fluxo {fluxo}", p)
+    linha("conversa completa", relatorio["conversas"])
+    banco = relatorio["banco"]
+    print(f"   banco: {banco['tempo_total_s']:.2f} s em funções *_sqlite; reservas {banco['reservas']}")
+    print("   (percentis do banco estimados pelos baldes de bella_sqlite_segundos)")
+    for nome, p in banco["funcoes"].items():
+        linha(f"  {nome}", p)
+    gemini = relatorio["gemini"]
+    print(f"   gemini: {gemini['requisicoes']} requisições, {gemini['erros_503']} com 503, "
+          f"fallback em {gemini['taxa_fallback']:.1%} das consultas, disjuntor aberto {gemini['aberturas_disjuntor']}x")
+    fila = gemini["fila"]
+    print(f"   fila: espera média {fila['espera_media_ms']:.1f} ms (máx {fila['espera_maxima_ms']:.1f} ms), "
+          f"descartadas {fila['descartadas'] or 0}")
+    if relatorio["erros"]["total"]:
+        print(f"   ❌ {relatorio['erros']['total']} erro(s): {relatorio['erros']['exemplos']}")
+
+
+def comparar(relatorio, arquivo):
+    """Mostra a variação das métricas principais em relação a uma execução anterior"""
+    with open(arquivo, encoding="utf-8") as entrada:
+        anterior = json.load(entrada)
+    print(f"\n🔁 Comparação com {arquivo} ({anterior['quando']}):")
+    itens = [
+        ("mensagens/s", ("vazao", "mensagens_por_s")),
+        ("p50 mensagem (ms)", ("mensagens", "p50_ms")),
+        ("p95 mensagem (ms)", ("mensagens", "p95_ms")),
+        ("p99 mensagem (ms)", ("mensagens", "p99_ms")),
+        ("tempo no banco (s)", ("banco", "tempo_total_s")),
+        ("taxa de fallback", ("gemini", "taxa_fallback")),
+    ]
+    for rotulo, (secao, campo) in itens:
+        antes = anterior.get(secao, {}).get(campo)
+        depois = relatorio[secao].get(campo)
+        if antes is None or depois is None:
+            continue
+        variacao = f"{(depois - antes) / antes:+.1%}" if antes else "n/a"
+        print(f"   {rotulo:20} {antes:10.3f} -> {depois:10.3f}  ({variacao})")
+
+
+def ler_mix(texto):
+    mix = {}
+    for item in texto.split(","):
+        fluxo, _, peso = item.partition("=")
+        if fluxo not in ("agendamento", "sugestao", "duvida"):
+            raise argparse.ArgumentTypeError(f"fluxo desconhecido: {fluxo}")
+        mix[fluxo] = float(peso or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do atendimento da Bella com o Gemini simulado")
+    parser.add_argument("--clientes", type=int, default=50, help="clientes simultâneas")
+    parser.add_argument("--processos", type=int, default=1, help="processos (workers) dividindo as clientes")
+    parser.add_argument("--conversas", type=int, default=5, help="conversas seguidas por cliente")
+    parser.add_argument("--mix", type=ler_mix, default="agendamento=1,sugestao=1,duvida=1",
+                        help="peso de cada fluxo, ex: agendamento=2,duvida=1")
+    parser.add_argument("--pausa-ms", type=float, default=0, help="tempo médio de digitação entre mensagens")
+    parser.add_argument("--latencia-ms", type=float, default=300, help="latência do Gemini até o primeiro trecho")
+    parser.add_argument("--atraso-trecho-ms", type=float, default=20, help="intervalo entre trechos do streaming")
+    parser.add_argument("--taxa-503", type=float, default=0.0, help="fração das requisições respondidas com 503")
+    parser.add_argument("--rpm", type=int, default=100000, help="cota de requisições por minuto do escalonador")
+    parser.add_argument("--tpm", type=int, default=100000000, help="cota de tokens de entrada por minuto")
+    parser.add_argument("--limite-cliente", type=int, default=100000, help="chamadas por minuto por cliente")
+    parser.add_argument("--max-simultaneas", type=int, default=10, help="limite de chamadas ao Gemini por processo")
+    parser.add_argument("--sem-cache", action="store_true", help="desliga o cache de respostas do Gemini")
+    parser.add_argument("--sem-faq", action="store_true", help="nunca responde pelo índice local de FAQ")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", default="bench_carga.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    config = {
+        "clientes": args.clientes, "processos": args.processos, "conversas": args.conversas, "mix": args.mix,
+        "pausa_ms": args.pausa_ms, "latencia_ms": args.latencia_ms, "atraso_trecho_ms": args.atraso_trecho_ms,
+        "taxa_503": args.taxa_503, "max_simultaneas": args.max_simultaneas, "sem_cache": args.sem_cache,
+        "sem_faq": args.sem_faq,
+        "rpm": args.rpm,
+        "tpm": args.tpm,
+        "limite_cliente": args.limite_cliente,
+        "semente": args.semente,
+    }
+    servidor = ServidorGeminiFalso(latencia=args.latencia_ms / 1000, atraso_trecho=args.atraso_trecho_ms / 1000,
+                                   texto_resposta=RESPOSTA_SIMULADA, taxa_erro=args.taxa_503)
+    url = servidor.iniciar()
+    arquivo = os.path.join(tempfile.mkdtemp(), "carga.db")
+    BancoDados(arquivo).migrar()
+
+    contexto = multiprocessing.get_context("fork")
+    largada = contexto.Event()
+    fila = contexto.Queue()
+    filhos = [contexto.Process(target=executar_processo, args=(config, p, url, arquivo, largada, fila))
+              for p in range(args.processos)]
+    try:
+        for filho in filhos:
+            filho.start()
+        time.sleep(0.2)
+        largada.set()
+        partes = [fila.get() for _ in filhos]
+        for filho in filhos:
+            filho.join()
+    finally:
+        servidor.parar()
+
+    relatorio = consolidar(config, partes, servidor)
+    imprimir(relatorio)
+    if args.comparar:
+        comparar(relatorio, args.comparar)
+    with open(args.saida, "w", encoding="utf-8") as saida:
+        json.dump(relatorio, saida, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados gravados em {args.saida}")
+    if relatorio["erros"]["total"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
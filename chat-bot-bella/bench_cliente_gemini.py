@@ -0,0 +1,71 @@
+"""Benchmark de latência: conexão nova por requisição x conexão keep-alive reutilizada.
+
+Sobe o Gemini simulado (mock_gemini.py) localmente e compara o padrão antigo (uma
+conexão nova a cada chamada, aqui com uma aiohttp.ClientSession por requisição) com o
+ClienteGeminiAsync usado pelo bot, que reaproveita as conexões do pool.
+
+Uso: python bench_cliente_gemini.py [requisicoes]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import aiohttp
+
+from cliente_gemini import ClienteGeminiAsync
+from mock_gemini import ServidorGeminiFalso
+
+PROMPT = "Uma cliente do salão de beleza tem a seguinte dúvida: 'como hidratar cabelo cacheado?'" * 10
+
+
+async def medir(enviar, requisicoes):
+    latencias = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        await enviar()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+
+def resumir(rotulo, latencias):
+    latencias = sorted(latencias)
+    p95 = latencias[int(len(latencias) * 0.95) - 1]
+    print(f"{rotulo:22} média {statistics.mean(latencias):6.3f} ms | "
+          f"p50 {statistics.median(latencias):6.3f} ms | p95 {p95:6.3f} ms")
+    return statistics.mean(latencias)
+
+
+async def comparar(url, requisicoes):
+    cliente = ClienteGeminiAsync(url, modo_persona="inline")
+
+    async def conexao_nova():
+        async with aiohttp.ClientSession() as sessao:
+            async with sessao.post(url, json={"contents": [{"parts": [{"text": PROMPT}]}]}) as resposta:
+                await resposta.json(content_type=None)
+
+    async def conexao_reutilizada():
+        await cliente.gerar(PROMPT)
+
+    try:
+        await medir(conexao_nova, 20)  # Aquecimento
+        await medir(conexao_reutilizada, 20)
+        nova = resumir("conexão nova", await medir(conexao_nova, requisicoes))
+        reutilizada = resumir("conexão reutilizada", await medir(conexao_reutilizada, requisicoes))
+        print(f"Ganho: {nova / reutilizada:.2f}x (sem TLS; contra o Gemini real o handshake TLS aumenta a diferença)")
+    finally:
+        await cliente.fechar()
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    servidor = ServidorGeminiFalso()
+    url = servidor.iniciar()
+    try:
+        asyncio.run(comparar(url, requisicoes))
+    finally:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
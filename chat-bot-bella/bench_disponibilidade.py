@@ -0,0 +1,69 @@
+"""Benchmark da consulta de horários livres com o histórico crescendo até 1M de agendamentos.
+
+Compara a consulta antiga (SELECT horario FROM agendamentos, sem filtro) com
+obter_horarios_livres_sqlite, que usa o índice (data, colaboradora, horario).
+
+Uso: python bench_disponibilidade.py [total_de_linhas]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import bella
+from armazenamento import BancoDados
+
+REPETICOES = 200
+
+
+def gerar_linhas(inicio, fim):
+    """Um agendamento por (dia, colaboradora, horário), preenchendo dias consecutivos"""
+    por_dia = len(bella.COLABORADORAS) * len(bella.HORARIOS_DISPONIVEIS)
+    primeiro_dia = date(1900, 1, 1)
+    for i in range(inicio, fim):
+        dia, resto = divmod(i, por_dia)
+        colaboradora = bella.COLABORADORAS[resto // len(bella.HORARIOS_DISPONIVEIS)]
+        horario = bella.HORARIOS_DISPONIVEIS[resto % len(bella.HORARIOS_DISPONIVEIS)]
+        data = (primeiro_dia + timedelta(days=dia)).isoformat()
+        yield ("01/01/1900 10:00", "Cliente", "0", colaboradora, "Corte", horario, data)
+
+
+def medir(funcao, repeticoes=REPETICOES):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    pasta = tempfile.mkdtemp()
+    bella.BANCO = BancoDados(os.path.join(pasta, "bench.db"))
+    bella.criar_tabela_agendamentos_sqlite()
+    conexao = bella.conectar_bd()
+
+    def consulta_antiga():
+        return [linha[0] for linha in conexao.execute("SELECT horario FROM agendamentos")]
+
+    print(f"{'linhas':>10} {'antiga (ms)':>12} {'indexada (ms)':>14}")
+    inseridas = 0
+    tamanho = 10_000
+    while inseridas < total:
+        alvo = min(tamanho, total)
+        with conexao:
+            conexao.executemany(
+                "INSERT INTO agendamentos (timestamp, nome_cliente, telefone, colaboradora, servico, horario, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", gerar_linhas(inseridas, alvo))
+        inseridas = alvo
+        hoje = date.today().isoformat()
+        antiga = medir(consulta_antiga, max(1, REPETICOES * 10_000 // inseridas))
+        indexada = medir(lambda: bella.obter_horarios_livres_sqlite(hoje))
+        print(f"{inseridas:>10} {antiga:>12.3f} {indexada:>14.4f}")
+        tamanho *= 10
+
+    bella.BANCO.fechar()
+
+
+if __name__ == "__main__":
+    main()
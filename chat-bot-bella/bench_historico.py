@@ -0,0 +1,95 @@
+"""Benchmark do historico_agendamentos.py com um log antigo de milhões de linhas.
+
+Gera um agendamentos.txt sintético (um agendamento por dia, profissional e horário, com
+~1% de linhas repetidas e algumas fora do formato), importa, exporta em CSV e JSONL e
+gera o relatório diário, mostrando linhas/s de cada etapa e o pico de memória do
+processo — que não deve crescer com o tamanho do log.
+
+Uso: python bench_historico.py [linhas] [tamanho_do_lote]
+"""
+import io
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import historico_agendamentos as historico
+from agenda import COLABORADORAS, HORARIOS_DISPONIVEIS
+from armazenamento import BancoDados
+
+SERVICOS = ["Corte de cabelo", "Escova", "Manicure", "Pedicure", "Hidratação capilar", "Coloração", "Sobrancelha"]
+
+
+def gerar_log(caminho, total):
+    """Escreve `total` linhas no formato do log antigo, preenchendo dias consecutivos desde 1990"""
+    por_dia = len(COLABORADORAS) * len(HORARIOS_DISPONIVEIS)
+    primeiro_dia = date(1990, 1, 1)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        linha = ""
+        for i in range(total):
+            if i % 100 == 99:
+                arquivo.write(linha)  # Repetida: deve ser descartada na importação
+                continue
+            if i % 100_000 == 50_000:
+                arquivo.write("linha corrompida do log antigo\n")
+                continue
+            dia, resto = divmod(i, por_dia)
+            colaboradora = COLABORADORAS[resto // len(HORARIOS_DISPONIVEIS)]
+            horario = HORARIOS_DISPONIVEIS[resto % len(HORARIOS_DISPONIVEIS)]
+            data = primeiro_dia + timedelta(days=dia)
+            linha = (f"{data:%d/%m/%Y} 09:{i % 60:02d} - Cliente: Cliente {i} - Número: 55119{i:08d} - "
+                     f"{colaboradora} - {SERVICOS[i % len(SERVICOS)]} às {horario}\n")
+            arquivo.write(linha)
+
+
+def pico_memoria_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Descarte(io.TextIOBase):
+    """Saída que só conta os caracteres escritos (evita medir o disco na exportação)"""
+
+    def __init__(self):
+        self.caracteres = 0
+
+    def write(self, texto):
+        self.caracteres += len(texto)
+        return len(texto)
+
+
+def etapa(rotulo, funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    print(f"   {rotulo:<22} {time.perf_counter() - inicio:7.1f} s   pico de memória {pico_memoria_mb():7.1f} MB",
+          file=sys.stderr)
+    return resultado
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    tamanho_lote = int(sys.argv[2]) if len(sys.argv) > 2 else historico.TAMANHO_LOTE
+    pasta = tempfile.mkdtemp()
+    log = os.path.join(pasta, "agendamentos.txt")
+    banco = BancoDados(os.path.join(pasta, "historico.db"))
+    banco.migrar()
+
+    print(f"📜 Gerando log com {total:,} linhas em {pasta}", file=sys.stderr)
+    etapa("geração do log", lambda: gerar_log(log, total))
+    resultado = etapa("importação", lambda: historico.importar_log(banco, log, tamanho_lote))
+    # Reimportar o mesmo log não duplica nada
+    repetida = etapa("reimportação", lambda: historico.importar_log(banco, log, tamanho_lote))
+    assert repetida["inseridas"] == 0 and repetida["descartadas"] == resultado["lidas"]
+    etapa("exportação csv", lambda: historico.exportar(banco, "csv", Descarte()))
+    etapa("exportação jsonl", lambda: historico.exportar(banco, "jsonl", Descarte()))
+    etapa("relatório diário", lambda: historico.imprimir_relatorio(historico.relatorio_diario(banco), "csv",
+                                                                  Descarte()))
+    print(f"✅ {resultado['inseridas']:,} agendamentos no banco "
+          f"({resultado['descartadas']:,} repetidas e {resultado['invalidas']:,} inválidas descartadas)",
+          file=sys.stderr)
+    banco.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compara as formas de enviar a personalidade da Bella ao Gemini (inline, systemInstruction e cache).
+
+Para cada modo, envia os mesmos prompts ao Gemini simulado (mock_gemini.py) e mostra
+bytes enviados, tokens de prompt (e quantos vieram do cache) e latência por chamada.
+Com GEMINI_API_KEY definida e --real, usa a API de verdade.
+
+Uso: python bench_persona.py [chamadas] [--real]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import bella
+from cliente_gemini import ClienteGeminiAsync, MODOS_PERSONA
+from mock_gemini import ServidorGeminiFalso
+
+PROMPTS = [
+    "Solicitação da cliente: Crie uma mensagem de despedida calorosa e breve para uma cliente do salão de beleza que está encerrando a conversa.",
+    "Solicitação da cliente: Uma cliente do salão de beleza tem a seguinte dúvida: 'como hidratar cabelo cacheado?'. Responda de forma completa.",
+]
+
+
+async def medir_modo(url, modo, chamadas):
+    cliente = ClienteGeminiAsync(url, instrucoes_sistema=bella.INSTRUCOES_PERSONALIDADE, modo_persona=modo)
+    latencias = []
+    try:
+        await cliente.gerar(PROMPTS[0])  # Aquecimento: conexão e criação do cache
+        cliente.uso_total = dict.fromkeys(cliente.uso_total, 0)
+        for i in range(chamadas):
+            inicio = time.perf_counter()
+            status, _ = await cliente.gerar(PROMPTS[i % len(PROMPTS)])
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                print(f"  {modo}: status {status}")
+    finally:
+        await cliente.fechar()
+    uso = cliente.uso_total
+    n = max(uso["chamadas"], 1)
+    print(f"{modo:8} (usado: {cliente.modo_persona:8}) {uso['bytes_enviados'] / n:8.0f} B/chamada "
+          f"{uso['tokens_prompt'] / n:7.0f} tokens de prompt ({uso['tokens_em_cache'] / n:5.0f} do cache) "
+          f"{sum(latencias) / len(latencias) * 1000:8.2f} ms")
+
+
+async def main():
+    chamadas = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 50
+    servidor = None
+    if "--real" in sys.argv and os.getenv("GEMINI_API_KEY"):
+        url = bella.URL
+    else:
+        servidor = ServidorGeminiFalso()
+        url = servidor.iniciar()
+    try:
+        for modo in reversed(MODOS_PERSONA):
+            await medir_modo(url, modo, chamadas)
+    finally:
+        if servidor:
+            servidor.parar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
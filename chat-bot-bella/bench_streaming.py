@@ -0,0 +1,63 @@
+"""Tempo até o primeiro trecho (TTFT): resposta bloqueante x streaming.
+
+O Gemini simulado (mock_gemini.py) leva `latencia` até o primeiro trecho e
+`atraso_trecho` para cada trecho seguinte. Sem streaming, a cliente só vê algo
+quando a resposta inteira fica pronta.
+
+Uso: python bench_streaming.py [requisicoes] [latencia_ms] [atraso_trecho_ms]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from cliente_gemini import ClienteGeminiAsync, extrair_texto
+from mock_gemini import ServidorGeminiFalso
+
+RESPOSTA_LONGA = (
+    "Para cabelos cacheados ressecados, recomendamos começar com uma hidratação profunda no salão, "
+    "seguida de um cronograma capilar em casa alternando hidratação, nutrição e reconstrução. "
+    "Evite água muito quente, use leave-in com proteção térmica e prefira pentes de dentes largos. "
+    "Nossa equipe pode avaliar a porosidade dos fios e indicar os produtos ideais para você."
+)
+
+
+async def medir(cliente, requisicoes, streaming):
+    primeiros, totais = [], []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        if streaming:
+            texto = []
+            async for trecho in cliente.gerar_stream("Como cuidar de cabelo cacheado?"):
+                if not texto:
+                    primeiros.append(time.perf_counter() - inicio)
+                texto.append(trecho)
+            texto = "".join(texto)
+        else:
+            _, resposta_json = await cliente.gerar("Como cuidar de cabelo cacheado?")
+            texto = extrair_texto(resposta_json)
+            primeiros.append(time.perf_counter() - inicio)
+        totais.append(time.perf_counter() - inicio)
+        assert texto == RESPOSTA_LONGA
+    return statistics.median(primeiros) * 1000, statistics.median(totais) * 1000
+
+
+async def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.3
+    atraso_trecho = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05
+    servidor = ServidorGeminiFalso(latencia=latencia, atraso_trecho=atraso_trecho, texto_resposta=RESPOSTA_LONGA)
+    cliente = ClienteGeminiAsync(servidor.iniciar())
+    try:
+        print(f"{len(servidor.trechos_resposta())} trechos, {latencia * 1000:.0f} ms até o primeiro, "
+              f"{atraso_trecho * 1000:.0f} ms entre trechos")
+        for rotulo, streaming in (("bloqueante", False), ("streaming", True)):
+            primeiro, total = await medir(cliente, requisicoes, streaming)
+            print(f"{rotulo:11} primeiro texto em {primeiro:7.1f} ms | resposta completa em {total:7.1f} ms")
+    finally:
+        await cliente.fechar()
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Microbenchmark do classificador de escopo.
+
+Compara o classificador compilado (topicos.py) com a versão antiga de
+verificar_topico_permitido, que varria cada palavra-chave com `in`.
+
+Uso: python bench_topicos.py [repeticoes]
+"""
+import sys
+import timeit
+
+from topicos import PALAVRAS_CABELO, PALAVRAS_FREQUENTES, PALAVRAS_UNHAS, PALAVRAS_SALAO, classificar_topico
+
+MENSAGENS = [
+    "Oi, boa tarde! Meu cabelo está muito ressecado depois da última progressiva, o que vocês recomendam?",
+    "Queria saber se vocês fazem hidratacao com queratina e quanto tempo dura mais ou menos",
+    "Minhas unhas estão quebradiças e descascando, tem algum tratamento que ajude?",
+    "Vocês trabalham aos sábados? Preciso de um horário para a semana que vem, de preferência de manhã",
+    "Qual é a previsão do tempo para amanhã aqui na cidade? Vai chover?",
+    "Eu queria fazer luzes mas tenho medo de estragar os fios, já fiz alisamento há dois meses",
+    "Quem ganhou o jogo ontem à noite? Não consegui assistir e queria saber o placar",
+    "Estou indecisa entre fazer um corte repicado ou só aparar as pontas, o que fica melhor em cabelo fino?",
+    "Bom dia, tudo bem com você? Estou só passando para dizer oi mesmo",
+    "Meu filho precisa de ajuda com a lição de matemática, você sabe resolver equações de segundo grau?",
+    "Quanto custa a francesinha com esmalte vermelho? Queria fazer antes do casamento da minha irmã",
+    "Vocês fazem luzes em loiro acinzentado? Tenho uma foto de referência para mostrar",
+]
+
+
+def verificar_topico_legado(texto):
+    """Implementação original: monta as listas e faz uma busca por palavra-chave"""
+    todas_permitidas = PALAVRAS_CABELO + PALAVRAS_UNHAS + PALAVRAS_SALAO
+    texto = texto.lower()
+    for palavra in todas_permitidas:
+        if palavra.lower() in texto:
+            return True
+    return False
+
+
+def medir(funcao, mensagens, repeticoes):
+    """Melhor de 5 rodadas, em microssegundos por mensagem"""
+    tempos = timeit.repeat(lambda: [funcao(m) for m in mensagens], number=repeticoes, repeat=5)
+    return min(tempos) / (repeticoes * len(mensagens)) * 1e6
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for mensagem in MENSAGENS:
+        print(f"{str(classificar_topico(mensagem)):>14} | {mensagem[:70]}")
+
+    no_escopo = [m for m in MENSAGENS if verificar_topico_legado(m)]
+    fora_do_escopo = [m for m in MENSAGENS if not verificar_topico_legado(m)]
+    # No escopo, mas sem nenhuma das PALAVRAS_FREQUENTES: passam pela expressão completa
+    sem_frequentes = [m for m in no_escopo if not any(p in m.lower() for p in PALAVRAS_FREQUENTES)]
+
+    print(f"\n{'':22}{'legado':>10}{'compilado':>12}{'ganho':>8}")
+    for rotulo, mensagens in [("no escopo", no_escopo), ("  sem frequentes", sem_frequentes),
+                              ("fora do escopo", fora_do_escopo), ("todas", MENSAGENS)]:
+        legado = medir(verificar_topico_legado, mensagens, repeticoes)
+        compilado = medir(classificar_topico, mensagens, repeticoes)
+        print(f"{rotulo:22}{legado:>8.2f}µs{compilado:>10.2f}µs{legado / compilado:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from topicos import normalizar_texto
+
+# Tempo de vida (em segundos) das respostas em cache por tipo de prompt
+TTL_POR_TIPO = {
+    "despedida": 24 * 3600,
+    "sugestao_indecisa": 24 * 3600,
+    "sugestao": 6 * 3600,
+    "duvida": 6 * 3600,
+}
+TTL_PADRAO = 3600
+
+
+def gerar_chave(texto):
+    """Gera a chave do cache a partir do prompt normalizado (minúsculas, sem acentos e espaços extras)"""
+    normalizado = " ".join(normalizar_texto(texto).split())
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Cache de respostas do Gemini com LRU em memória e camada opcional em SQLite.
+
+    A camada em memória guarda as `capacidade` entradas usadas mais recentemente.
+    Se `arquivo` for informado, as respostas também são gravadas em disco e
+    sobrevivem a reinícios do bot.
+    """
+
+    def __init__(self, capacidade=512, arquivo=None, ttl_por_tipo=None):
+        self.capacidade = capacidade
+        self.arquivo = arquivo
+        self.ttl_por_tipo = dict(TTL_POR_TIPO if ttl_por_tipo is None else ttl_por_tipo)
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._conexao = None
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+
+    def _conectar(self):
+        if self._conexao is None:
+            self._conexao = sqlite3.connect(self.arquivo, check_same_thread=False)
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS cache_respostas (
+                    chave TEXT PRIMARY KEY,
+                    tipo TEXT,
+                    resposta TEXT,
+                    expira_em REAL
+                )
+            """)
+            self._conexao.commit()
+        return self._conexao
+
+    def _guardar_memoria(self, chave, resposta, expira_em):
+        self._memoria[chave] = (resposta, expira_em)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.capacidade:
+            self._memoria.popitem(last=False)
+
+    def obter(self, texto):
+        """Retorna a resposta em cache para o prompt, ou None se não houver entrada válida"""
+        chave = gerar_chave(texto)
+        agora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                if entrada[1] > agora:
+                    self._memoria.move_to_end(chave)
+                    self.acertos_memoria += 1
+                    return entrada[0]
+                del self._memoria[chave]
+
+            if self.arquivo:
+                conexao = self._conectar()
+                linha = conexao.execute(
+                    "SELECT resposta, expira_em FROM cache_respostas WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha and linha[1] > agora:
+                    self._guardar_memoria(chave, linha[0], linha[1])
+                    self.acertos_disco += 1
+                    return linha[0]
+                if linha:
+                    conexao.execute("DELETE FROM cache_respostas WHERE chave = ?", (chave,))
+                    conexao.commit()
+
+            self.falhas += 1
+            return None
+
+    def guardar(self, texto, resposta, tipo):
+        """Guarda a resposta do prompt com o TTL correspondente ao tipo"""
+        chave = gerar_chave(texto)
+        expira_em = time.time() + self.ttl_por_tipo.get(tipo, TTL_PADRAO)
+        with self._lock:
+            self._guardar_memoria(chave, resposta, expira_em)
+            if self.arquivo:
+                conexao = self._conectar()
+                conexao.execute(
+                    "INSERT OR REPLACE INTO cache_respostas (chave, tipo, resposta, expira_em) VALUES (?, ?, ?, ?)",
+                    (chave, tipo, resposta, expira_em)
+                )
+                conexao.commit()
+
+    def limpar(self):
+        """Remove todas as entradas do cache (memória e disco)"""
+        with self._lock:
+            self._memoria.clear()
+            if self.arquivo:
+                conexao = self._conectar()
+                conexao.execute("DELETE FROM cache_respostas")
+                conexao.commit()
+
+    def estatisticas(self):
+        """Retorna os contadores de acertos e falhas do cache"""
+        with self._lock:
+            consultas = self.acertos_memoria + self.acertos_disco + self.falhas
+            acertos = self.acertos_memoria + self.acertos_disco
+            return {
+                "entradas_memoria": len(self._memoria),
+                "acertos_memoria": self.acertos_memoria,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "taxa_acerto": acertos / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,280 @@
+import asyncio
+import json
+import re
+import time
+
+import aiohttp
+
+from metricas import BALDES_TOKENS
+
+# Formas de enviar as instruções de personalidade, da mais econômica para a mais simples:
+# "cache"   -> conteúdo em cache no Gemini (cachedContents), referenciado pelo nome
+# "sistema" -> campo systemInstruction, separado da mensagem da cliente
+# "inline"  -> texto das instruções antes do prompt (comportamento original)
+MODOS_PERSONA = ("cache", "sistema", "inline")
+
+_MARCADOR_PROMPT = "__PROMPT_DA_CLIENTE__"
+
+
+class EsqueletoCorpo:
+    """Corpo JSON da requisição serializado uma única vez.
+
+    A cada chamada apenas o prompt (escapado como JSON) é inserido no lugar do marcador.
+    """
+
+    def __init__(self, instrucoes=None, modo="inline", conteudo_em_cache=None):
+        if modo == "cache":
+            corpo = {"cachedContent": conteudo_em_cache,
+                     "contents": [{"role": "user", "parts": [{"text": _MARCADOR_PROMPT}]}]}
+        elif modo == "sistema" and instrucoes:
+            corpo = {"systemInstruction": {"parts": [{"text": instrucoes}]},
+                     "contents": [{"role": "user", "parts": [{"text": _MARCADOR_PROMPT}]}]}
+        else:
+            texto = f"{instrucoes}\n\n{_MARCADOR_PROMPT}" if instrucoes else _MARCADOR_PROMPT
+            corpo = {"contents": [{"parts": [{"text": texto}]}]}
+        prefixo, sufixo = json.dumps(corpo, ensure_ascii=False).split(_MARCADOR_PROMPT)
+        self.prefixo = prefixo.encode("utf-8")
+        self.sufixo = sufixo.encode("utf-8")
+
+    def montar(self, texto):
+        return self.prefixo + json.dumps(texto, ensure_ascii=False)[1:-1].encode("utf-8") + self.sufixo
+
+
+# Trechos da mensagem de erro do Gemini que indicam que o modo de persona não é aceito
+# (comparados sem espaços, "_" e maiúsculas): campo não suportado pelo modelo ou cache inexistente
+_RECUSAS_DO_MODO = {
+    "cache": ("cachedcontent",),
+    "sistema": ("systeminstruction", "developerinstruction"),
+}
+
+
+def recusa_do_modo(modo, corpo_erro):
+    """True se o corpo de erro do Gemini diz que o `modo` de persona não é aceito
+
+    Outros erros 400/403/404 (chave inválida, argumento inválido no prompt...) não
+    mudam o modo: voltam para quem chamou como qualquer outro status de erro.
+    """
+    try:
+        erro = json.loads(corpo_erro).get("error", {})
+    except (ValueError, AttributeError):
+        return False
+    texto = re.sub(r"[\s_]", "", f"{erro.get('message', '')} {erro.get('status', '')}".lower())
+    return any(trecho in texto for trecho in _RECUSAS_DO_MODO.get(modo, ()))
+
+
+def extrair_texto(resposta_json):
+    """Extrai o texto da primeira candidata de uma resposta do Gemini"""
+    return resposta_json['candidates'][0]['content']['parts'][0]['text']
+
+
+class ErroHTTPGemini(Exception):
+    """Resposta HTTP de erro recebida ao abrir um streaming do Gemini"""
+
+    def __init__(self, status):
+        super().__init__(f"código {status}")
+        self.status = status
+
+
+class ClienteGeminiAsync:
+    """Cliente HTTP assíncrono de longa duração para o Gemini, baseado em aiohttp.
+
+    A sessão mantém um pool de conexões keep-alive, evitando um novo handshake TCP/TLS
+    a cada pergunta, e o corpo JSON é montado a partir de um esqueleto serializado uma
+    única vez (EsqueletoCorpo). Um semáforo limita quantas requisições ficam em
+    andamento ao mesmo tempo, de modo que um único processo atenda várias conversas sem
+    estourar o Gemini. A sessão é criada no primeiro uso, dentro do event loop que fará
+    as chamadas.
+
+    As `instrucoes_sistema` (personalidade da Bella) são enviadas conforme `modo_persona`
+    (ver MODOS_PERSONA). Se a API responder que o modo atual não é aceito (recusa_do_modo),
+    rebaixar_modo() passa para o próximo, até chegar ao envio inline.
+
+    Com `metricas` (RegistroMetricas), os tokens de cada chamada (usageMetadata) viram
+    histogramas por `origem`; `uso_total` acumula os mesmos números no processo.
+    """
+
+    def __init__(self, url, tamanho_pool=10, timeout_conexao=5, timeout_leitura=60, max_simultaneas=10,
+                 instrucoes_sistema=None, modo_persona="sistema", ttl_cache=3600, metricas=None):
+        self.url = url
+        self.instrucoes_sistema = instrucoes_sistema
+        self.ttl_cache = ttl_cache
+        self._conteudo_em_cache = None
+        self._cache_expira_em = 0
+        self._lock_cache = None
+        self.definir_modo(modo_persona)
+        self.metricas = metricas
+        self.uso_total = {"chamadas": 0, "bytes_enviados": 0, "tokens_prompt": 0,
+                          "tokens_em_cache": 0, "tokens_resposta": 0}
+        self.tamanho_pool = tamanho_pool
+        self.timeout_conexao = timeout_conexao
+        self.timeout_leitura = timeout_leitura
+        self.max_simultaneas = max_simultaneas
+        self._sessao = None
+        self._semaforo = None
+        self._loop = None
+        self.em_andamento = 0  # Requisições ocupando o semáforo neste momento
+
+    def _obter_sessao(self):
+        loop = asyncio.get_running_loop()
+        # A sessão e o semáforo pertencem ao loop em que foram criados
+        if self._sessao is None or self._sessao.closed or self._loop is not loop:
+            self._loop = loop
+            self._sessao = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.tamanho_pool),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.timeout_conexao,
+                                              sock_read=self.timeout_leitura),
+                headers={"Content-Type": "application/json"},
+            )
+            self._semaforo = asyncio.Semaphore(self.max_simultaneas)
+            self._lock_cache = asyncio.Lock()
+        return self._sessao
+
+    def definir_modo(self, modo):
+        """Troca a forma de envio da personalidade e remonta o esqueleto do corpo"""
+        if modo not in MODOS_PERSONA:
+            raise ValueError(f"Modo de persona inválido: {modo}")
+        self.modo_persona = modo
+        self._esqueleto = EsqueletoCorpo(self.instrucoes_sistema, modo, self._conteudo_em_cache)
+
+    def rebaixar_modo(self, modo_atual):
+        """Passa de `modo_atual` para o próximo modo de persona
+
+        Não faz nada se outra requisição já tiver rebaixado o modo. Retorna False se não
+        houver mais para onde rebaixar (envio inline).
+        """
+        if self.modo_persona != modo_atual:
+            return True
+        indice = MODOS_PERSONA.index(modo_atual)
+        if indice == len(MODOS_PERSONA) - 1:
+            return False
+        self.definir_modo(MODOS_PERSONA[indice + 1])
+        return True
+
+    def _url_cache(self):
+        """Deriva a URL de cachedContents e o nome do modelo a partir da URL de generateContent"""
+        if "/models/" not in self.url:
+            return None, None
+        base, resto = self.url.split("/models/", 1)
+        modelo, _, consulta = resto.partition(":")
+        _, _, chave = consulta.partition("?")
+        return f"{base}/cachedContents" + (f"?{chave}" if chave else ""), f"models/{modelo}"
+
+    async def _preparar_cache(self, sessao):
+        """Cria (ou recria, se expirado) o conteúdo em cache com a personalidade"""
+        async with self._lock_cache:
+            if self._conteudo_em_cache and time.time() < self._cache_expira_em:
+                return True
+            url, modelo = self._url_cache()
+            if url is None or not self.instrucoes_sistema:
+                return False
+            corpo = {"model": modelo, "ttl": f"{self.ttl_cache}s",
+                     "systemInstruction": {"parts": [{"text": self.instrucoes_sistema}]}}
+            async with sessao.post(url, data=json.dumps(corpo, ensure_ascii=False).encode("utf-8")) as resposta:
+                if resposta.status != 200:
+                    await resposta.read()
+                    return False
+                self._conteudo_em_cache = (await resposta.json(content_type=None))["name"]
+            # Renova um pouco antes de o Gemini expirar o conteúdo
+            self._cache_expira_em = time.time() + self.ttl_cache * 0.9
+            self.definir_modo("cache")
+            return True
+
+    def _registrar_uso(self, corpo, resposta_json, origem, modo):
+        uso = resposta_json.get("usageMetadata", {})
+        tokens = {
+            "tokens_prompt": uso.get("promptTokenCount", 0),
+            "tokens_em_cache": uso.get("cachedContentTokenCount", 0),
+            "tokens_resposta": uso.get("candidatesTokenCount", 0),
+        }
+        self.uso_total["chamadas"] += 1
+        self.uso_total["bytes_enviados"] += len(corpo)
+        for campo, valor in tokens.items():
+            self.uso_total[campo] += valor
+            if self.metricas is not None:
+                self.metricas.observar(f"bella_gemini_{campo}", valor, BALDES_TOKENS, origem=origem or "outra",
+                                       modo=modo)
+
+    async def _preparar_modo(self, sessao):
+        if self.modo_persona == "cache" and time.time() >= self._cache_expira_em:
+            try:
+                criado = await self._preparar_cache(sessao)
+            except Exception:
+                criado = False
+            if not criado:
+                self.rebaixar_modo("cache")
+
+    async def gerar(self, texto, origem=None):
+        """Envia o prompt ao Gemini e retorna (status_http, json) — json é None se status != 200
+
+        `origem` só rotula as métricas de tokens (ex: "duvida", "confirmacao").
+        """
+        sessao = self._obter_sessao()
+        await self._preparar_modo(sessao)
+
+        while True:
+            modo = self.modo_persona
+            corpo = self._esqueleto.montar(texto)
+            async with self._semaforo:
+                self.em_andamento += 1
+                try:
+                    async with sessao.post(self.url, data=corpo) as resposta:
+                        status = resposta.status
+                        resposta_json = await resposta.json(content_type=None) if status == 200 else None
+                        corpo_erro = await resposta.read() if resposta_json is None else None
+                finally:
+                    self.em_andamento -= 1
+            if self._tentar_proximo_modo(status, corpo_erro, modo):
+                continue
+            if resposta_json is not None:
+                self._registrar_uso(corpo, resposta_json, origem, modo)
+            return status, resposta_json
+
+    def _tentar_proximo_modo(self, status, corpo_erro, modo):
+        """Rebaixa o modo se a API recusou o modo de persona (ex: systemInstruction não suportado, cache expirado)"""
+        return (status in (400, 403, 404) and modo != "inline" and recusa_do_modo(modo, corpo_erro)
+                and self.rebaixar_modo(modo))
+
+    def _url_stream(self):
+        url = self.url.replace(":generateContent", ":streamGenerateContent", 1)
+        return url + ("&" if "?" in url else "?") + "alt=sse"
+
+    async def gerar_stream(self, texto, origem=None):
+        """Gerador assíncrono com os trechos de texto à medida que o Gemini os produz
+
+        Usa streamGenerateContent (eventos SSE). Lança ErroHTTPGemini se a resposta
+        não for 200; erros no meio do streaming são propagados ao consumidor.
+        """
+        sessao = self._obter_sessao()
+        await self._preparar_modo(sessao)
+
+        while True:
+            modo = self.modo_persona
+            corpo = self._esqueleto.montar(texto)
+            async with self._semaforo:
+                self.em_andamento += 1
+                try:
+                    async with sessao.post(self._url_stream(), data=corpo) as resposta:
+                        if resposta.status != 200:
+                            corpo_erro = await resposta.read()
+                            status = resposta.status
+                        else:
+                            ultimo_evento = {}
+                            async for linha in resposta.content:
+                                if not linha.startswith(b"data:"):
+                                    continue
+                                ultimo_evento = json.loads(linha[5:])
+                                partes = ultimo_evento.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+                                for parte in partes:
+                                    if parte.get("text"):
+                                        yield parte["text"]
+                            self._registrar_uso(corpo, ultimo_evento, origem, modo)
+                            return
+                finally:
+                    self.em_andamento -= 1
+            if self._tentar_proximo_modo(status, corpo_erro, modo):
+                continue
+            raise ErroHTTPGemini(status)
+
+    async def fechar(self):
+        if self._sessao is not None:
+            await self._sessao.close()
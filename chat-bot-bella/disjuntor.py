@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class DisjuntorCircuito:
+    """Disjuntor (circuit breaker) compartilhado pelas chamadas ao Gemini.
+
+    - fechado: as chamadas passam normalmente; `limite_falhas` falhas seguidas abrem o circuito
+    - aberto: as chamadas são recusadas na hora (quem chama usa o fallback) por `tempo_aberto` segundos
+    - meio_aberto: passado esse tempo, uma única chamada de teste é liberada; se der certo o
+      circuito fecha, se falhar volta a abrir
+    """
+
+    def __init__(self, limite_falhas=5, tempo_aberto=30):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.recusadas = 0
+        self.fallbacks = 0
+        self.aberturas = 0
+
+    def permitir(self):
+        """Retorna True se a chamada pode ser feita agora"""
+        with self._lock:
+            if self.estado == "fechado":
+                return True
+            if self.estado == "aberto" and time.monotonic() - self._aberto_em >= self.tempo_aberto:
+                self.estado = "meio_aberto"
+                self._teste_em_andamento = False
+            # Um teste abandonado (ex: chamada cancelada) não bloqueia o circuito para sempre
+            teste_vencido = time.monotonic() - self._aberto_em >= 2 * self.tempo_aberto
+            if self.estado == "meio_aberto" and (not self._teste_em_andamento or teste_vencido):
+                self._teste_em_andamento = True
+                self._aberto_em = time.monotonic() - self.tempo_aberto
+                return True
+            self.recusadas += 1
+            return False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.estado = "fechado"
+            self.falhas_seguidas = 0
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas_seguidas += 1
+            if self.estado == "meio_aberto" or self.falhas_seguidas >= self.limite_falhas:
+                if self.estado != "aberto":
+                    self.aberturas += 1
+                self.estado = "aberto"
+                self._aberto_em = time.monotonic()
+                self._teste_em_andamento = False
+
+    def desistir(self):
+        """Chamada abandonada antes da resposta (prazo esgotado, descartada pela fila): nem sucesso nem falha
+
+        Se era a chamada de teste do meio_aberto, libera o teste para a próxima chamada.
+        """
+        with self._lock:
+            if self.estado == "meio_aberto":
+                self._teste_em_andamento = False
+
+    def registrar_consulta(self, usou_fallback):
+        """Contabiliza uma consulta concluída, para acompanhar a taxa de fallback"""
+        with self._lock:
+            self.consultas += 1
+            if usou_fallback:
+                self.fallbacks += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "falhas_seguidas": self.falhas_seguidas,
+                "aberturas": self.aberturas,
+                "recusadas": self.recusadas,
+                "consultas": self.consultas,
+                "fallbacks": self.fallbacks,
+                "taxa_fallback": self.fallbacks / self.consultas if self.consultas else 0.0,
+            }
@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+
+
+class BaldeFichas:
+    """Token bucket: `capacidade` fichas, repostas continuamente à razão de `taxa` por segundo"""
+
+    __slots__ = ("taxa", "capacidade", "fichas", "_atualizado_em")
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.fichas = capacidade
+        self._atualizado_em = time.monotonic()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self._atualizado_em) * self.taxa)
+        self._atualizado_em = agora
+
+    def espera(self, quantidade):
+        """Segundos até haver `quantidade` fichas (0 se já houver)"""
+        self._repor()
+        falta = min(quantidade, self.capacidade) - self.fichas
+        return falta / self.taxa if falta > 0 else 0.0
+
+    def consumir(self, quantidade):
+        self._repor()
+        self.fichas -= min(quantidade, self.capacidade)
+
+    def disponiveis(self):
+        self._repor()
+        return self.fichas
+
+
+class EscalonadorGemini:
+    """Fila de prioridade na frente das chamadas ao Gemini, com limites por token bucket.
+
+    - global: `requisicoes_por_minuto` e `tokens_por_minuto` (tokens de entrada), a cota do Gemini
+    - por telefone: `requisicoes_por_telefone` por minuto; acima disso a chamada é descartada
+    - prioridade: menor número passa primeiro (ex: confirmação de agendamento antes da despedida)
+    - com `profundidade_maxima` chamadas na fila, as de prioridade >= `prioridade_descartavel`
+      são descartadas na hora, e quem chamou responde com o fallback
+    - chamadas cuja espera estimada passa do `prazo` também são descartadas na hora, em vez
+      de ocupar a fila até o prazo estourar
+
+    Pertence a um único event loop por vez (como a sessão do ClienteGeminiAsync).
+    """
+
+    def __init__(self, requisicoes_por_minuto=15, tokens_por_minuto=1_000_000, requisicoes_por_telefone=10,
+                 profundidade_maxima=20, prioridade_descartavel=2, max_telefones=10000):
+        self.requisicoes = BaldeFichas(requisicoes_por_minuto / 60, requisicoes_por_minuto)
+        self.tokens = BaldeFichas(tokens_por_minuto / 60, tokens_por_minuto)
+        self.requisicoes_por_telefone = requisicoes_por_telefone
+        self.profundidade_maxima = profundidade_maxima
+        self.prioridade_descartavel = prioridade_descartavel
+        self.max_telefones = max_telefones
+        self._por_telefone = OrderedDict()
+        self._fila = []             # heap de (prioridade, ordem, tokens, futuro)
+        self._ordem = itertools.count()
+        self._aguardando = 0
+        self._temporizador = None
+        self._loop = None
+        self.liberadas = 0
+        self.descartadas = {}
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def _balde_telefone(self, telefone):
+        balde = self._por_telefone.get(telefone)
+        if balde is None:
+            capacidade = max(1, self.requisicoes_por_telefone // 2)
+            balde = self._por_telefone[telefone] = BaldeFichas(self.requisicoes_por_telefone / 60, capacidade)
+            while len(self._por_telefone) > self.max_telefones:
+                self._por_telefone.popitem(last=False)
+        else:
+            self._por_telefone.move_to_end(telefone)
+        return balde
+
+    def _descartar(self, motivo):
+        self.descartadas[motivo] = self.descartadas.get(motivo, 0) + 1
+        return motivo
+
+    def espera_estimada(self, prioridade):
+        """Segundos até uma nova chamada com essa prioridade ser liberada, pela cota de requisições"""
+        a_frente = sum(1 for item in self._fila if item[0] <= prioridade and not item[3].done())
+        return max(0.0, a_frente + 1 - self.requisicoes.disponiveis()) / self.requisicoes.taxa
+
+    async def reservar_vez(self, prioridade, tokens=0, telefone=None, prazo=None):
+        """Aguarda a vez da chamada; retorna None quando liberada ou o motivo do descarte"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._fila, self._aguardando, self._temporizador = loop, [], 0, None
+
+        # Chamadas críticas (prioridade 0) não são barradas pelo limite da cliente
+        if telefone is not None and prioridade > 0:
+            balde = self._balde_telefone(telefone)
+            if balde.espera(1) > 0:
+                return self._descartar("limite_cliente")
+            balde.consumir(1)
+        if self._aguardando >= self.profundidade_maxima and prioridade >= self.prioridade_descartavel:
+            return self._descartar("fila_cheia")
+        if prazo is not None and self.espera_estimada(prioridade) > prazo:
+            return self._descartar("espera_estimada")
+
+        futuro = loop.create_future()
+        heapq.heappush(self._fila, (prioridade, next(self._ordem), tokens, futuro))
+        self._aguardando += 1
+        inicio = time.monotonic()
+        self._despachar()
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            # Desistiu (ex: prazo esgotado): sai da fila; se já tinha sido liberada, a vez se perde
+            if not futuro.done() or futuro.cancelled():
+                self._aguardando -= 1
+            raise
+        espera = time.monotonic() - inicio
+        self.liberadas += 1
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+        return None
+
+    def _despachar(self):
+        """Libera as chamadas do topo da fila enquanto houver fichas; agenda a próxima verificação"""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        while self._fila:
+            _, _, tokens, futuro = self._fila[0]
+            if futuro.done():
+                heapq.heappop(self._fila)
+                continue
+            espera = max(self.requisicoes.espera(1), self.tokens.espera(tokens))
+            if espera > 0:
+                self._temporizador = self._loop.call_later(espera, self._despachar)
+                return
+            heapq.heappop(self._fila)
+            self.requisicoes.consumir(1)
+            self.tokens.consumir(tokens)
+            self._aguardando -= 1
+            futuro.set_result(None)
+
+    def estatisticas(self):
+        return {
+            "profundidade": self._aguardando,
+            "liberadas": self.liberadas,
+            "descartadas": dict(self.descartadas),
+            "espera_media": self.espera_total / self.liberadas if self.liberadas else 0.0,
+            "espera_maxima": self.espera_maxima,
+            "requisicoes_disponiveis": int(self.requisicoes.disponiveis()),
+        }
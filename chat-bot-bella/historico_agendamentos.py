@@ -0,0 +1,268 @@
+"""Importação, exportação e relatórios do histórico de agendamentos, em fluxo contínuo.
+
+- importar: lê o log antigo (agendamentos.txt, uma linha por agendamento no formato
+  "dd/mm/aaaa hh:mm - Cliente: X - Número: Y - Ana - Serviço às HH:MM") e grava no
+  SQLite em lotes de `executemany`, cada lote em uma transação. Linhas repetidas ou
+  horários já ocupados são descartados pelo índice único (data, colaboradora, horario).
+- exportar: escreve a tabela em CSV ou JSONL iterando o cursor, sem carregar tudo.
+- relatorio: ocupação e faturamento por dia e profissional, agregados pelo próprio
+  SQLite (GROUP BY sobre o índice); o Python só formata uma linha por vez. A
+  capacidade de cada dia usa a agenda atual de agenda.py (a jornada não tem
+  histórico), então dias antigos são medidos contra a jornada de hoje.
+
+A memória usada não depende do tamanho do histórico. A vazão (linhas/s) sai no stderr.
+
+Uso: python historico_agendamentos.py importar agendamentos.txt [--lote 50000]
+     python historico_agendamentos.py exportar csv|jsonl [--saida ARQUIVO] [--desde AAAA-MM-DD] [--ate AAAA-MM-DD]
+     python historico_agendamentos.py relatorio [--formato texto|csv] [--desde AAAA-MM-DD] [--ate AAAA-MM-DD]
+(--banco escolhe o arquivo SQLite; por padrão, o do bot)
+"""
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from datetime import date
+from functools import lru_cache
+
+from agenda import COLABORADORAS, DIAS_FUNCIONAMENTO, HORARIOS_DISPONIVEIS, JORNADAS, CalendarioOcupacao
+from armazenamento import ARQUIVO_BANCO, BancoDados
+from topicos import normalizar_texto
+
+TAMANHO_LOTE = 50_000
+
+LINHA_LOG = re.compile(
+    r"(\d{2})/(\d{2})/(\d{4}) (\d{2}:\d{2}) - Cliente: (.*?) - Número: (.*?) - (.+?) - (.+) às (\d{2}:\d{2})\s*$"
+)
+
+# Preço de referência (R$) por palavra-chave do serviço; a primeira que aparecer no nome vale
+PRECOS_SERVICOS = [
+    ("progressiva", 220.0), ("alisamento", 220.0), ("mechas", 250.0), ("luzes", 250.0),
+    ("coloracao", 180.0), ("tintura", 180.0), ("penteado", 120.0), ("hidratacao", 90.0),
+    ("escova", 60.0), ("corte", 80.0), ("alongamento", 150.0), ("gel", 120.0),
+    ("pedicure", 45.0), ("manicure", 40.0), ("unha", 40.0),
+]
+
+COLUNAS_EXPORTACAO = ["id", "data", "horario", "colaboradora", "servico", "nome_cliente", "telefone", "timestamp"]
+
+
+@lru_cache(maxsize=4096)
+def preco_servico(servico):
+    """Preço de referência do serviço (texto livre), ou None se não houver palavra-chave conhecida"""
+    nome = normalizar_texto(servico or "")
+    for palavra, preco in PRECOS_SERVICOS:
+        if palavra in nome:
+            return preco
+    return None
+
+
+class Vazao:
+    """Contador de linhas com progresso e linhas/s no stderr"""
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.linhas = 0
+        self.inicio = time.perf_counter()
+
+    def somar(self, quantidade):
+        self.linhas += quantidade
+        decorrido = time.perf_counter() - self.inicio
+        print(f"\r⏳ {self.rotulo}: {self.linhas:,} linhas, {self.linhas / max(decorrido, 1e-9):,.0f} linhas/s",
+              end="", file=sys.stderr, flush=True)
+
+    def concluir(self, detalhe=""):
+        decorrido = time.perf_counter() - self.inicio
+        print(f"\r✅ {self.rotulo}: {self.linhas:,} linhas em {decorrido:.1f} s "
+              f"({self.linhas / max(decorrido, 1e-9):,.0f} linhas/s) {detalhe}", file=sys.stderr)
+        return decorrido
+
+
+def ler_log(arquivo):
+    """Gera (número da linha, registro) por linha não vazia; o registro é None se a linha estiver fora do formato
+
+    O registro segue a ordem das colunas do INSERT: (timestamp, nome, telefone, colaboradora,
+    servico, horario, data).
+    """
+    for numero, linha in enumerate(arquivo, 1):
+        if not linha.strip():
+            continue
+        encontrado = LINHA_LOG.match(linha)
+        if encontrado is None:
+            yield numero, None
+            continue
+        dia, mes, ano, hora, nome, telefone, colaboradora, servico, horario = encontrado.groups()
+        yield numero, (f"{dia}/{mes}/{ano} {hora}", nome.strip(), telefone.strip(), colaboradora.strip(),
+                       servico.strip(), horario, f"{ano}-{mes}-{dia}")
+
+
+def importar_log(banco, caminho, tamanho_lote=TAMANHO_LOTE):
+    """Importa o log antigo em lotes; retorna {"lidas", "inseridas", "descartadas", "invalidas"}
+
+    O log antigo só tinha agendamentos para o próprio dia, então a data do atendimento é
+    a data do registro (como na migração 2 do esquema).
+    """
+    resultado = {"lidas": 0, "inseridas": 0, "descartadas": 0, "invalidas": 0}
+    vazao = Vazao("importação")
+
+    def gravar(lote):
+        with banco.transacao() as conexao:
+            antes = conexao.total_changes
+            conexao.executemany("""
+                INSERT INTO agendamentos (timestamp, nome_cliente, telefone, colaboradora, servico, horario, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (data, colaboradora, horario) DO NOTHING
+            """, lote)
+            inseridas = conexao.total_changes - antes
+        resultado["inseridas"] += inseridas
+        resultado["descartadas"] += len(lote) - inseridas
+        vazao.somar(len(lote))
+
+    lote = []
+    with open(caminho, encoding="utf-8", errors="replace") as arquivo:
+        for numero, registro in ler_log(arquivo):
+            if registro is None:
+                resultado["invalidas"] += 1
+                if resultado["invalidas"] <= 5:
+                    print(f"\n⚠️ Linha {numero} fora do formato esperado", file=sys.stderr)
+                continue
+            resultado["lidas"] += 1
+            lote.append(registro)
+            if len(lote) >= tamanho_lote:
+                gravar(lote)
+                lote = []
+    if lote:
+        gravar(lote)
+    vazao.concluir(f"- {resultado['inseridas']:,} novas, {resultado['descartadas']:,} repetidas/ocupadas, "
+                   f"{resultado['invalidas']:,} inválidas")
+    return resultado
+
+
+def _filtro_datas(desde, ate):
+    return "WHERE data BETWEEN ? AND ?", (desde or "0000-00-00", ate or "9999-99-99")
+
+
+def exportar(banco, formato, saida, desde=None, ate=None):
+    """Escreve os agendamentos (por data, profissional e horário) em CSV ou JSONL; retorna quantas linhas"""
+    filtro, parametros = _filtro_datas(desde, ate)
+    # A ordem do índice único dispensa ordenação em memória pelo SQLite
+    cursor = banco.conexao().execute(
+        f"SELECT {', '.join(COLUNAS_EXPORTACAO)} FROM agendamentos {filtro} ORDER BY data, colaboradora, horario",
+        parametros
+    )
+    cursor.arraysize = 10_000
+    vazao = Vazao(f"exportação {formato}")
+    if formato == "csv":
+        escritor = csv.writer(saida)
+        escritor.writerow(COLUNAS_EXPORTACAO)
+    while True:
+        linhas = cursor.fetchmany()
+        if not linhas:
+            break
+        if formato == "csv":
+            escritor.writerows(linhas)
+        else:
+            saida.writelines(json.dumps(dict(zip(COLUNAS_EXPORTACAO, linha)), ensure_ascii=False) + "\n"
+                             for linha in linhas)
+        vazao.somar(len(linhas))
+    vazao.concluir()
+    return vazao.linhas
+
+
+def relatorio_diario(banco, desde=None, ate=None):
+    """Gera (data, colaboradora, atendimentos, capacidade, faturamento, sem_preco) por dia e profissional
+
+    A contagem e a soma dos preços são feitas no SQLite (preco_servico é registrada como
+    função SQL); a capacidade vem da jornada atual da profissional naquele dia da semana.
+    """
+    calendario = CalendarioOcupacao(HORARIOS_DISPONIVEIS, COLABORADORAS, DIAS_FUNCIONAMENTO, JORNADAS)
+    conexao = banco.conexao()
+    conexao.create_function("preco_servico", 1, preco_servico, deterministic=True)
+    filtro, parametros = _filtro_datas(desde, ate)
+    cursor = conexao.execute(f"""
+        SELECT data, colaboradora, COUNT(*), SUM(preco), COUNT(*) - COUNT(preco)
+        FROM (SELECT data, colaboradora, preco_servico(servico) AS preco FROM agendamentos {filtro})
+        GROUP BY data, colaboradora
+        ORDER BY data, colaboradora
+    """, parametros)
+    for data, colaboradora, atendimentos, faturamento, sem_preco in cursor:
+        try:
+            capacidade = len(calendario.jornada(date.fromisoformat(data), colaboradora))
+        except (KeyError, ValueError, TypeError):
+            capacidade = 0  # Profissional que não está mais no salão ou data inválida no histórico
+        yield data, colaboradora, atendimentos, capacidade, faturamento or 0.0, sem_preco
+
+
+def imprimir_relatorio(linhas, formato, saida):
+    """Escreve o relatório linha a linha e, no fim, os totais por profissional"""
+    totais = {}
+    vazao = Vazao("relatório")
+    if formato == "csv":
+        escritor = csv.writer(saida)
+        escritor.writerow(["data", "colaboradora", "atendimentos", "capacidade", "ocupacao", "faturamento",
+                           "sem_preco"])
+    else:
+        saida.write(f"{'data':<10}  {'profissional':<12} {'atend.':>6} {'ocupação':>9} {'faturamento':>12} "
+                    f"{'sem preço':>9}\n")
+    for data, colaboradora, atendimentos, capacidade, faturamento, sem_preco in linhas:
+        ocupacao = atendimentos / capacidade if capacidade else None
+        if formato == "csv":
+            escritor.writerow([data, colaboradora, atendimentos, capacidade,
+                               "" if ocupacao is None else f"{ocupacao:.3f}", f"{faturamento:.2f}", sem_preco])
+        else:
+            texto_ocupacao = "-" if ocupacao is None else f"{ocupacao:.0%}"
+            saida.write(f"{data:<10}  {colaboradora:<12} {atendimentos:>6} {texto_ocupacao:>9} {faturamento:>12,.2f} "
+                        f"{sem_preco:>9}\n")
+        total = totais.setdefault(colaboradora, [0, 0, 0.0, 0])
+        total[0] += atendimentos
+        total[1] += capacidade
+        total[2] += faturamento
+        total[3] += sem_preco
+        vazao.linhas += 1
+    vazao.concluir()
+    if formato != "csv":
+        saida.write("\n📊 Totais por profissional\n")
+        for colaboradora, (atendimentos, capacidade, faturamento, sem_preco) in sorted(totais.items()):
+            texto_ocupacao = f"{atendimentos / capacidade:.0%}" if capacidade else "-"
+            saida.write(f"{'':<10}  {colaboradora:<12} {atendimentos:>6} {texto_ocupacao:>9} {faturamento:>12,.2f} "
+                        f"{sem_preco:>9}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--banco", default=ARQUIVO_BANCO, help="arquivo SQLite dos agendamentos")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    importar = comandos.add_parser("importar", help="importa o log antigo agendamentos.txt")
+    importar.add_argument("arquivo")
+    importar.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por transação")
+    exportacao = comandos.add_parser("exportar", help="exporta os agendamentos em CSV ou JSONL")
+    exportacao.add_argument("formato", choices=["csv", "jsonl"])
+    relatorio = comandos.add_parser("relatorio", help="ocupação e faturamento por dia e profissional")
+    relatorio.add_argument("--formato", choices=["texto", "csv"], default="texto")
+    for subcomando in (exportacao, relatorio):
+        subcomando.add_argument("--saida", help="arquivo de saída (padrão: stdout)")
+        subcomando.add_argument("--desde", help="primeiro dia (AAAA-MM-DD)")
+        subcomando.add_argument("--ate", help="último dia (AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    banco = BancoDados(args.banco)
+    banco.migrar()
+    try:
+        if args.comando == "importar":
+            importar_log(banco, args.arquivo, args.lote)
+            return
+        saida = open(args.saida, "w", encoding="utf-8", newline="") if args.saida else sys.stdout
+        try:
+            if args.comando == "exportar":
+                exportar(banco, args.formato, saida, args.desde, args.ate)
+            else:
+                imprimir_relatorio(relatorio_diario(banco, args.desde, args.ate), args.formato, saida)
+        finally:
+            if saida is not sys.stdout:
+                saida.close()
+    finally:
+        banco.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Índice local de perguntas já respondidas (FAQ), para responder sem chamar o Gemini.
+
+Cada pergunta vira um vetor TF-IDF de n-gramas de caracteres (tolerante a acentos,
+plurais e erros de digitação); a busca é a similaridade de cosseno contra todas as
+entradas aprovadas, somada pelas listas de entradas de cada n-grama da pergunta (índice
+invertido esparso). As entradas ficam em SQLite e são carregadas uma única vez; novas
+aprovações só acrescentam uma linha às listas, e o IDF é recalculado quando o índice
+mudou mais que FRACAO_PARA_RECALCULAR desde o último cálculo.
+
+Uso: python indice_faq.py listar | pendentes | aprovar ID | remover ID | adicionar TIPO "PERGUNTA" "RESPOSTA"
+"""
+import math
+import re
+from array import array
+import sqlite3
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Sem NumPy a pontuação é feita em Python puro (mais lenta, mesmo resultado)
+    np = None
+
+from cache_respostas import gerar_chave
+from topicos import normalizar_texto
+
+TAMANHO_NGRAMA = 3
+LIMIAR_PADRAO = 0.8        # Similaridade mínima para responder localmente
+FRACAO_PARA_RECALCULAR = 0.1  # Inclusões/remoções (fração das entradas) que disparam o recálculo do IDF
+VOTOS_PARA_APROVAR = None  # Aprovação automática desligada: respostas votadas esperam o `aprovar` do salão
+
+
+def extrair_ngramas(texto, n=TAMANHO_NGRAMA):
+    """Conta os n-gramas de caracteres de cada palavra do texto normalizado"""
+    contagem = {}
+    for palavra in re.findall(r"[a-z0-9]+", normalizar_texto(texto)):
+        marcada = f" {palavra} "
+        for i in range(max(len(marcada) - n + 1, 1)):
+            ngrama = marcada[i:i + n]
+            contagem[ngrama] = contagem.get(ngrama, 0) + 1
+    return contagem
+
+
+class EntradaFAQ:
+    __slots__ = ("id", "tipo", "pergunta", "resposta", "ngramas")
+
+    def __init__(self, id, tipo, pergunta, resposta):
+        self.id = id
+        self.tipo = tipo
+        self.pergunta = pergunta
+        self.resposta = resposta
+        self.ngramas = extrair_ngramas(pergunta)
+
+
+class IndiceFAQ:
+    """Busca por similaridade entre a pergunta da cliente e as perguntas aprovadas.
+
+    Respostas do Gemini que as clientes marcam como úteis viram candidatas (pendentes) e
+    só passam a ser respondidas localmente depois da aprovação do salão. Com
+    `votos_para_aprovar`, a aprovação é automática ao atingir esse número de telefones
+    distintos. Sem `arquivo`, o índice vive apenas em memória.
+    """
+
+    def __init__(self, arquivo=None, limiar=LIMIAR_PADRAO, votos_para_aprovar=VOTOS_PARA_APROVAR):
+        self.arquivo = arquivo
+        self.limiar = limiar
+        self.votos_para_aprovar = votos_para_aprovar
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._entradas = None      # Entradas aprovadas por linha (None = removida), carregadas na primeira busca
+        self._linhas = {}          # id -> linha
+        self._postings = {}        # n-grama -> (linhas, pesos TF) das entradas que o contêm
+        self._df = {}              # n-grama -> número de entradas ativas que o contêm
+        self._idf = {}             # IDF do último recálculo
+        self._idf_desconhecido = 1.0
+        self._normas = array("d")  # Norma TF-IDF de cada linha (infinita = removida)
+        self._tipos = array("i")   # Código do tipo de cada linha (-1 = removida)
+        self._codigos = {}         # tipo -> código
+        self._ativas = 0
+        self._mudancas = 0         # Inclusões e remoções desde o último recálculo
+        self.acertos = 0
+        self.falhas = 0
+
+    def _conectar(self):
+        if self._conexao is None:
+            self._conexao = sqlite3.connect(self.arquivo or ":memory:", check_same_thread=False)
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS faq (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tipo TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    pergunta TEXT NOT NULL,
+                    resposta TEXT NOT NULL,
+                    votos_uteis INTEGER NOT NULL DEFAULT 0,
+                    votos_inuteis INTEGER NOT NULL DEFAULT 0,
+                    aprovada INTEGER NOT NULL DEFAULT 0,
+                    curada INTEGER NOT NULL DEFAULT 0,  -- Aprovada pelo salão (aprovar/adicionar)
+                    criada_em REAL NOT NULL,
+                    UNIQUE (tipo, chave)
+                )
+            """)
+            # Um voto por telefone e entrada: a mesma cliente repetindo a pergunta não soma votos
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS faq_votos (
+                    faq_id INTEGER NOT NULL,
+                    telefone TEXT NOT NULL,
+                    PRIMARY KEY (faq_id, telefone)
+                )
+            """)
+            self._conexao.commit()
+        return self._conexao
+
+    def _carregar(self):
+        if self._entradas is None:
+            linhas = self._conectar().execute(
+                "SELECT id, tipo, pergunta, resposta FROM faq WHERE aprovada = 1 ORDER BY id"
+            ).fetchall()
+            self._entradas = []
+            for linha in linhas:
+                self._anexar(EntradaFAQ(*linha))
+            self._recalcular()
+
+    def _peso(self, ngrama, contagem):
+        return (1 + math.log(contagem)) * self._idf.get(ngrama, self._idf_desconhecido)
+
+    def _anexar(self, entrada):
+        """Acrescenta a entrada ao final do índice, com o IDF atual (sem recalcular as demais)"""
+        linha = len(self._entradas)
+        self._entradas.append(entrada)
+        self._linhas[entrada.id] = linha
+        for ngrama, contagem in entrada.ngramas.items():
+            postings = self._postings.get(ngrama)
+            if postings is None:
+                postings = self._postings[ngrama] = (array("q"), array("d"))
+            postings[0].append(linha)
+            postings[1].append(1 + math.log(contagem))
+            self._df[ngrama] = self._df.get(ngrama, 0) + 1
+        norma = math.sqrt(sum(self._peso(ngrama, contagem) ** 2 for ngrama, contagem in entrada.ngramas.items()))
+        self._normas.append(norma or 1.0)
+        self._tipos.append(self._codigos.setdefault(entrada.tipo, len(self._codigos)))
+        self._ativas += 1
+        self._mudancas += 1
+
+    def _incluir(self, id, tipo, pergunta, resposta):
+        self._carregar()
+        if id not in self._linhas:
+            self._anexar(EntradaFAQ(id, tipo, pergunta, resposta))
+
+    def _excluir(self, id):
+        self._carregar()
+        linha = self._linhas.pop(id, None)
+        if linha is None:
+            return
+        for ngrama in self._entradas[linha].ngramas:
+            self._df[ngrama] -= 1
+        self._entradas[linha] = None
+        self._normas[linha] = math.inf
+        self._tipos[linha] = -1
+        self._ativas -= 1
+        self._mudancas += 1
+
+    def _recalcular(self):
+        """Recalcula IDF e normas (e descarta as linhas removidas) percorrendo só as listas esparsas"""
+        entradas = [entrada for entrada in self._entradas if entrada is not None]
+        if len(entradas) != len(self._entradas):
+            self._entradas, self._linhas, self._postings, self._df = [], {}, {}, {}
+            self._normas, self._tipos, self._ativas = array("d"), array("i"), 0
+            for entrada in entradas:
+                self._anexar(entrada)
+        total = len(entradas)
+        self._idf = {ngrama: math.log((1 + total) / (1 + df)) + 1 for ngrama, df in self._df.items()}
+        self._idf_desconhecido = math.log(1 + total) + 1
+        quadrados = [0.0] * total
+        for ngrama, (linhas, pesos) in self._postings.items():
+            idf = self._idf[ngrama]
+            for linha, peso in zip(linhas, pesos):
+                quadrados[linha] += (peso * idf) ** 2
+        self._normas = array("d", (math.sqrt(quadrado) or 1.0 for quadrado in quadrados))
+        self._mudancas = 0
+
+    def _vetorizar(self, ngramas):
+        """Pesos da consulta já multiplicados pelo IDF da entrada; n-gramas fora do índice contam só na norma"""
+        pesos = {}
+        norma = 0.0
+        for ngrama, contagem in ngramas.items():
+            peso = self._peso(ngrama, contagem)
+            norma += peso * peso
+            if ngrama in self._postings:
+                pesos[ngrama] = peso * self._idf.get(ngrama, self._idf_desconhecido)
+        norma = math.sqrt(norma) or 1.0
+        return {ngrama: peso / norma for ngrama, peso in pesos.items()}
+
+    def buscar(self, pergunta, tipo):
+        """Retorna (id, resposta, similaridade) da entrada aprovada mais parecida, ou None abaixo do limiar"""
+        ngramas = extrair_ngramas(pergunta)
+        with self._lock:
+            self._carregar()
+            if self._mudancas > self._ativas * FRACAO_PARA_RECALCULAR:
+                self._recalcular()
+            codigo = self._codigos.get(tipo)
+            if not self._ativas or not ngramas or codigo is None:
+                self.falhas += 1
+                return None
+            consulta = self._vetorizar(ngramas)
+            if np is not None:
+                pontuacoes = np.zeros(len(self._entradas))
+                for ngrama, peso in consulta.items():
+                    linhas, pesos = self._postings[ngrama]
+                    pontuacoes[np.frombuffer(linhas, dtype=np.int64)] += np.frombuffer(pesos) * peso
+                pontuacoes /= np.frombuffer(self._normas)
+                pontuacoes[np.frombuffer(self._tipos, dtype=np.int32) != codigo] = -1.0
+                melhor = int(pontuacoes.argmax())
+                similaridade = float(pontuacoes[melhor])
+            else:
+                somas = {}
+                for ngrama, peso in consulta.items():
+                    linhas, pesos = self._postings[ngrama]
+                    for linha, peso_entrada in zip(linhas, pesos):
+                        somas[linha] = somas.get(linha, 0.0) + peso_entrada * peso
+                melhor, similaridade = 0, -1.0
+                for linha, soma in somas.items():
+                    if self._tipos[linha] == codigo and soma / self._normas[linha] > similaridade:
+                        melhor, similaridade = linha, soma / self._normas[linha]
+            if similaridade < self.limiar:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            entrada = self._entradas[melhor]
+            return entrada.id, entrada.resposta, similaridade
+
+    def _primeiro_voto(self, conexao, id, telefone):
+        """Registra o voto do telefone na entrada; False se ele já tinha votado"""
+        if telefone is None:
+            return True
+        return conexao.execute("INSERT OR IGNORE INTO faq_votos (faq_id, telefone) VALUES (?, ?)",
+                               (id, telefone)).rowcount == 1
+
+    def sugerir(self, pergunta, resposta, tipo, telefone=None):
+        """Registra um voto de utilidade para a resposta, que fica pendente de aprovação do salão
+
+        Com `votos_para_aprovar`, aprova sozinha ao atingir esse número de telefones distintos.
+        """
+        chave = gerar_chave(pergunta)
+        with self._lock:
+            conexao = self._conectar()
+            conexao.execute(
+                """
+                INSERT INTO faq (tipo, chave, pergunta, resposta, criada_em) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (tipo, chave) DO NOTHING
+                """,
+                (tipo, chave, pergunta, resposta, time.time())
+            )
+            id = conexao.execute("SELECT id FROM faq WHERE tipo = ? AND chave = ?", (tipo, chave)).fetchone()[0]
+            if self._primeiro_voto(conexao, id, telefone):
+                conexao.execute("UPDATE faq SET votos_uteis = votos_uteis + 1 WHERE id = ?", (id,))
+            pergunta, resposta, votos, aprovada = conexao.execute(
+                "SELECT pergunta, resposta, votos_uteis, aprovada FROM faq WHERE id = ?", (id,)
+            ).fetchone()
+            if not aprovada and self.votos_para_aprovar and votos >= self.votos_para_aprovar:
+                conexao.execute("UPDATE faq SET aprovada = 1 WHERE id = ?", (id,))
+                self._incluir(id, tipo, pergunta, resposta)
+            conexao.commit()
+            return id
+
+    def registrar_voto(self, id, util, telefone=None):
+        """Feedback sobre uma resposta dada pelo índice
+
+        Entradas aprovadas só por votos saem do índice com mais votos negativos que
+        positivos; as aprovadas pelo salão só saem pelo `remover`.
+        """
+        coluna = "votos_uteis" if util else "votos_inuteis"
+        with self._lock:
+            conexao = self._conectar()
+            if not self._primeiro_voto(conexao, id, telefone):
+                conexao.commit()
+                return
+            conexao.execute(f"UPDATE faq SET {coluna} = {coluna} + 1 WHERE id = ?", (id,))
+            if not util:
+                retirada = conexao.execute(
+                    "UPDATE faq SET aprovada = 0 "
+                    "WHERE id = ? AND aprovada = 1 AND curada = 0 AND votos_inuteis > votos_uteis",
+                    (id,)
+                ).rowcount
+                if retirada:
+                    self._excluir(id)
+            conexao.commit()
+
+    def adicionar(self, pergunta, resposta, tipo):
+        """Cadastra uma resposta já aprovada pelo salão"""
+        chave = gerar_chave(pergunta)
+        with self._lock:
+            conexao = self._conectar()
+            conexao.execute(
+                """
+                INSERT INTO faq (tipo, chave, pergunta, resposta, aprovada, curada, criada_em)
+                VALUES (?, ?, ?, ?, 1, 1, ?)
+                ON CONFLICT (tipo, chave) DO UPDATE SET resposta = excluded.resposta, aprovada = 1, curada = 1
+                """,
+                (tipo, chave, pergunta, resposta, time.time())
+            )
+            id = conexao.execute("SELECT id FROM faq WHERE tipo = ? AND chave = ?", (tipo, chave)).fetchone()[0]
+            conexao.commit()
+            self._excluir(id)
+            self._incluir(id, tipo, pergunta, resposta)
+            return id
+
+    def aprovar(self, id):
+        with self._lock:
+            conexao = self._conectar()
+            linha = conexao.execute("SELECT tipo, pergunta, resposta FROM faq WHERE id = ?", (id,)).fetchone()
+            if linha is None:
+                return False
+            conexao.execute("UPDATE faq SET aprovada = 1, curada = 1 WHERE id = ?", (id,))
+            conexao.commit()
+            self._incluir(id, *linha)
+            return True
+
+    def remover(self, id):
+        with self._lock:
+            conexao = self._conectar()
+            removida = conexao.execute("DELETE FROM faq WHERE id = ?", (id,)).rowcount
+            conexao.execute("DELETE FROM faq_votos WHERE faq_id = ?", (id,))
+            conexao.commit()
+            self._excluir(id)
+            return bool(removida)
+
+    def listar(self, aprovadas=True):
+        """Entradas do banco: [(id, tipo, pergunta, votos_uteis, votos_inuteis)]"""
+        with self._lock:
+            return self._conectar().execute(
+                "SELECT id, tipo, pergunta, votos_uteis, votos_inuteis FROM faq WHERE aprovada = ? ORDER BY id",
+                (1 if aprovadas else 0,)
+            ).fetchall()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": self._ativas,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+
+def main():
+    import bella
+
+    indice = bella.INDICE_FAQ
+    comando = sys.argv[1] if len(sys.argv) > 1 else "listar"
+    if comando in ("listar", "pendentes"):
+        for id, tipo, pergunta, uteis, inuteis in indice.listar(aprovadas=comando == "listar"):
+            print(f"{id:5d} [{tipo}] 👍 {uteis} 👎 {inuteis}  {pergunta}")
+    elif comando == "aprovar" and len(sys.argv) == 3:
+        print("✅ Aprovada" if indice.aprovar(int(sys.argv[2])) else "❌ Entrada não encontrada")
+    elif comando == "remover" and len(sys.argv) == 3:
+        print("🗑️ Removida" if indice.remover(int(sys.argv[2])) else "❌ Entrada não encontrada")
+    elif comando == "adicionar" and len(sys.argv) == 5:
+        print(f"✅ Cadastrada com id {indice.adicionar(sys.argv[3], sys.argv[4], sys.argv[2])}")
+    else:
+        sys.exit(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import re
+from collections import deque
+
+ROTULOS = {"cliente": "Cliente", "bella": "Bella"}
+
+
+def estimar_tokens(texto):
+    """Estimativa de tokens sem tokenizador (~4 caracteres por token, como no português do Gemini)"""
+    return len(texto) // 4 + 1
+
+
+def _cortar(texto, max_tokens):
+    limite = max_tokens * 4
+    return texto if len(texto) <= limite else texto[:limite].rsplit(" ", 1)[0] + "…"
+
+
+class Turno:
+    __slots__ = ("autor", "texto", "tokens")
+
+    def __init__(self, autor, texto):
+        self.autor = autor
+        self.texto = texto
+        self.tokens = estimar_tokens(texto)
+
+
+class MemoriaConversa:
+    """Histórico de uma sessão com tamanho limitado.
+
+    Os turnos recentes ficam literais; os mais antigos viram uma linha curta no resumo
+    (a primeira frase do turno). O contexto gerado nunca passa de `orcamento_tokens`,
+    então o tamanho do prompt não cresce com a duração da conversa. Linhas acumuladas no
+    resumo podem ser condensadas pelo Gemini fora do caminho crítico (linhas_para_condensar
+    / aplicar_condensacao).
+    """
+
+    __slots__ = ("turnos", "resumo", "tokens_turnos", "tokens_resumo", "removidas", "condensando",
+                 "max_turnos", "orcamento_tokens", "max_tokens_resumo", "max_tokens_turno")
+
+    def __init__(self, max_turnos=8, orcamento_tokens=600, max_tokens_resumo=150, max_tokens_turno=200):
+        self.turnos = deque()
+        self.resumo = []            # Linhas do resumo, da mais antiga para a mais recente
+        self.tokens_turnos = 0
+        self.tokens_resumo = 0
+        self.removidas = 0          # Linhas já descartadas do início do resumo
+        self.condensando = False
+        self.max_turnos = max_turnos
+        self.orcamento_tokens = orcamento_tokens
+        self.max_tokens_resumo = max_tokens_resumo
+        self.max_tokens_turno = max_tokens_turno
+
+    def registrar(self, autor, texto):
+        """Acrescenta um turno ("cliente" ou "bella"), movendo os mais antigos para o resumo"""
+        texto = _cortar(" ".join(texto.split()), self.max_tokens_turno)
+        if not texto:
+            return
+        turno = Turno(autor, texto)
+        self.turnos.append(turno)
+        self.tokens_turnos += turno.tokens
+        limite = self.orcamento_tokens - self.max_tokens_resumo
+        while len(self.turnos) > self.max_turnos or self.tokens_turnos > limite:
+            self._resumir(self.turnos.popleft())
+
+    def _resumir(self, turno):
+        self.tokens_turnos -= turno.tokens
+        frase = re.split(r"(?<=[.!?])\s", turno.texto, maxsplit=1)[0]
+        self._acrescentar_resumo(f"{ROTULOS[turno.autor]}: {_cortar(frase, 30)}")
+
+    def _acrescentar_resumo(self, linha, inicio=False):
+        if inicio:
+            self.resumo.insert(0, linha)
+        else:
+            self.resumo.append(linha)
+        self.tokens_resumo += estimar_tokens(linha)
+        while self.tokens_resumo > self.max_tokens_resumo and len(self.resumo) > 1:
+            self.tokens_resumo -= estimar_tokens(self.resumo.pop(0))
+            self.removidas += 1
+
+    def contexto(self):
+        """Texto para `contexto_conversacional`, dentro do orçamento de tokens; None se vazio"""
+        linhas = []
+        if self.resumo:
+            linhas.append("Resumo do início da conversa: " + " | ".join(self.resumo))
+        linhas.extend(f"{ROTULOS[turno.autor]}: {turno.texto}" for turno in self.turnos)
+        return "\n".join(linhas) or None
+
+    def linhas_para_condensar(self, minimo=4):
+        """Retorna (texto, marca) com as linhas do resumo a condensar, ou None se ainda não compensa"""
+        if self.condensando or len(self.resumo) < minimo:
+            return None
+        self.condensando = True
+        return "\n".join(self.resumo), (len(self.resumo), self.removidas)
+
+    def aplicar_condensacao(self, texto, marca):
+        """Troca as linhas enviadas para condensar pelo texto condensado (linhas novas são mantidas)"""
+        self.condensando = False
+        if texto is None:
+            return
+        quantidade, removidas = marca
+        restantes = quantidade - (self.removidas - removidas)
+        if restantes <= 0:
+            return
+        for linha in self.resumo[:restantes]:
+            self.tokens_resumo -= estimar_tokens(linha)
+        del self.resumo[:restantes]
+        self._acrescentar_resumo(_cortar(" ".join(texto.split()), self.max_tokens_resumo // 2), inicio=True)
@@ -0,0 +1,203 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Limites dos histogramas de latência (segundos), de tamanho (bytes) e de tokens do Gemini
+BALDES_SEGUNDOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BALDES_BYTES = (64, 256, 1024, 4096, 16384, 65536)
+BALDES_TOKENS = (0, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+_sessao_atual = ContextVar("sessao_atual", default=None)
+
+
+class _Histograma:
+    __slots__ = ("baldes", "contagens", "soma", "total")
+
+    def __init__(self, baldes):
+        self.baldes = baldes
+        self.contagens = [0] * len(baldes)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect_left(self.baldes, valor)
+        if indice < len(self.contagens):
+            self.contagens[indice] += 1
+        self.soma += valor
+        self.total += 1
+
+
+def _formatar_rotulos(rotulos, extra=None):
+    pares = list(rotulos) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{chave}="{valor}"' for chave, valor in pares) + "}"
+
+
+class RegistroMetricas:
+    """Contadores e histogramas em memória, exportados no formato texto do Prometheus.
+
+    Desativado (padrão), cada chamada de registro custa apenas a verificação de
+    `self.ativo`. Com `rastreio` ligado, os eventos também são guardados por sessão
+    (telefone) para reconstruir onde uma conversa lenta gastou o tempo.
+    """
+
+    def __init__(self, ativo=False, rastreio=False, eventos_por_sessao=200, max_sessoes_rastreadas=1000):
+        self.ativo = ativo
+        self.rastreio = rastreio
+        self.eventos_por_sessao = eventos_por_sessao
+        self.max_sessoes_rastreadas = max_sessoes_rastreadas
+        self._contadores = {}
+        self._medidores = {}
+        self._histogramas = {}
+        self._ajuda = {}
+        self._rastros = OrderedDict()
+        self._lock = threading.Lock()
+
+    def descrever(self, nome, texto):
+        """Define o texto de ajuda (# HELP) de uma métrica"""
+        self._ajuda[nome] = texto
+
+    def contar(self, nome, valor=1, **rotulos):
+        if not self.ativo:
+            return
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+        if self.rastreio:
+            self._rastrear(nome, valor, rotulos)
+
+    def observar(self, nome, valor, baldes=BALDES_SEGUNDOS, **rotulos):
+        if not self.ativo:
+            return
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = _Histograma(baldes)
+            histograma.observar(valor)
+        if self.rastreio:
+            self._rastrear(nome, valor, rotulos)
+
+    def medir(self, nome, valor, **rotulos):
+        """Valor instantâneo (gauge), ex: profundidade de uma fila"""
+        if not self.ativo:
+            return
+        with self._lock:
+            self._medidores[(nome, tuple(sorted(rotulos.items())))] = valor
+
+    @contextmanager
+    def cronometrar(self, nome, **rotulos):
+        """Bloco `with` cuja duração vai para o histograma `nome`"""
+        if not self.ativo:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def cronometrar_funcao(self, nome):
+        """Decorador: registra a duração de cada chamada, com o nome da função como rótulo"""
+        def decorador(funcao):
+            rotulo = funcao.__name__
+
+            @wraps(funcao)
+            def envoltorio(*args, **kwargs):
+                if not self.ativo:
+                    return funcao(*args, **kwargs)
+                inicio = time.perf_counter()
+                try:
+                    return funcao(*args, **kwargs)
+                finally:
+                    self.observar(nome, time.perf_counter() - inicio, funcao=rotulo)
+            return envoltorio
+        return decorador
+
+    @contextmanager
+    def sessao(self, telefone):
+        """Associa os eventos registrados dentro do bloco à sessão da cliente"""
+        token = _sessao_atual.set(telefone)
+        try:
+            yield
+        finally:
+            _sessao_atual.reset(token)
+
+    def _rastrear(self, nome, valor, rotulos):
+        telefone = _sessao_atual.get()
+        if telefone is None:
+            return
+        with self._lock:
+            eventos = self._rastros.get(telefone)
+            if eventos is None:
+                eventos = self._rastros[telefone] = deque(maxlen=self.eventos_por_sessao)
+                while len(self._rastros) > self.max_sessoes_rastreadas:
+                    self._rastros.popitem(last=False)
+            eventos.append((time.time(), nome, valor, rotulos))
+
+    def rastro(self, telefone):
+        """Eventos registrados para a sessão: [(timestamp, métrica, valor, rótulos)]"""
+        with self._lock:
+            return list(self._rastros.get(telefone, ()))
+
+    def histogramas(self, nome):
+        """Cópia dos histogramas `nome`: [(rótulos, {"baldes", "contagens", "soma", "total"})]"""
+        with self._lock:
+            return [(dict(rotulos), {"baldes": list(h.baldes), "contagens": list(h.contagens), "soma": h.soma,
+                                     "total": h.total})
+                    for (chave, rotulos), h in sorted(self._histogramas.items(), key=lambda item: item[0])
+                    if chave == nome]
+
+    def exposicao(self):
+        """Gera o texto no formato de exposição do Prometheus"""
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            medidores = sorted(self._medidores.items())
+            histogramas = sorted(self._histogramas.items(), key=lambda item: item[0])
+            linhas = []
+            ultimo = None
+            for (nome, rotulos), valor in contadores:
+                if nome != ultimo:
+                    if nome in self._ajuda:
+                        linhas.append(f"# HELP {nome} {self._ajuda[nome]}")
+                    linhas.append(f"# TYPE {nome} counter")
+                    ultimo = nome
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+            for (nome, rotulos), valor in medidores:
+                if nome != ultimo:
+                    if nome in self._ajuda:
+                        linhas.append(f"# HELP {nome} {self._ajuda[nome]}")
+                    linhas.append(f"# TYPE {nome} gauge")
+                    ultimo = nome
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+            for (nome, rotulos), histograma in histogramas:
+                if nome != ultimo:
+                    if nome in self._ajuda:
+                        linhas.append(f"# HELP {nome} {self._ajuda[nome]}")
+                    linhas.append(f"# TYPE {nome} histogram")
+                    ultimo = nome
+                acumulado = 0
+                for limite, contagem in zip(histograma.baldes, histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, ('le', limite))} {acumulado}")
+                linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, ('le', '+Inf'))} {histograma.total}")
+                linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {histograma.soma}")
+                linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {histograma.total}")
+        return "\n".join(linhas) + "\n"
+
+    def despejar(self, arquivo):
+        """Grava a exposição atual em um arquivo (para coleta pelo node_exporter/textfile, por exemplo)"""
+        with open(arquivo, "w", encoding="utf-8") as saida:
+            saida.write(self.exposicao())
+
+    def limpar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._medidores.clear()
+            self._histogramas.clear()
+            self._rastros.clear()
@@ -0,0 +1,160 @@
+"""Servidor HTTP local que imita os endpoints generateContent/streamGenerateContent do Gemini.
+
+Usado pelos benchmarks para medir o bot sem chave de API nem acesso à rede.
+`latencia` é o tempo até o primeiro trecho e `atraso_trecho` o tempo de geração de cada
+trecho seguinte; sem streaming, a resposta inteira só sai depois de todos os trechos.
+Com `taxa_erro`, essa fração das requisições recebe 503 (serviço sobrecarregado) após a latência.
+
+Uso: python mock_gemini.py [porta] [latencia_ms] [atraso_trecho_ms] [taxa_erro]
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPOSTA_PADRAO = "Olá! Sou a Bella (resposta simulada). Posso ajudar com cabelos e unhas."
+
+
+class ManipuladorGemini(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Mantém a conexão aberta entre requisições (keep-alive)
+    disable_nagle_algorithm = True  # Evita o atraso de ~40 ms do Nagle entre cabeçalho e corpo
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        try:
+            self._atender()
+        except (BrokenPipeError, ConnectionResetError):
+            # O bot desistiu da requisição (ex: prazo esgotado) e fechou a conexão
+            self.close_connection = True
+
+    def _atender(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        pedido = json.loads(self.rfile.read(tamanho) or b"{}")
+        if "/cachedContents" in self.path:
+            self._responder(self.server.criar_cache(pedido))
+            return
+        if not self.server.contar_requisicao():
+            time.sleep(self.server.latencia)
+            self._responder({"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}},
+                            status=503)
+            return
+        trechos = self.server.trechos_resposta()
+        uso = self.server.contar_tokens(pedido)
+        if ":streamGenerateContent" in self.path:
+            self._transmitir(trechos, uso)
+            return
+        time.sleep(self.server.latencia + self.server.atraso_trecho * (len(trechos) - 1))
+        self._responder({
+            "candidates": [{"content": {"parts": [{"text": self.server.texto_resposta}]}}],
+            "usageMetadata": uso,
+        })
+
+    def _transmitir(self, trechos, uso):
+        """Envia os trechos como eventos SSE, em chunks HTTP, com o atraso configurado entre eles"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.server.latencia)
+        for i, trecho in enumerate(trechos):
+            if i:
+                time.sleep(self.server.atraso_trecho)
+            evento = {"candidates": [{"content": {"parts": [{"text": trecho}], "role": "model"}}]}
+            if i == len(trechos) - 1:
+                evento["usageMetadata"] = uso
+            dados = f"data: {json.dumps(evento)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(dados):X}\r\n".encode("ascii") + dados + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _responder(self, dados, status=200):
+        corpo = json.dumps(dados).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def _estimar_tokens(conteudo):
+    """Estimativa grosseira de tokens (~4 caracteres por token) de um trecho do pedido"""
+    return len(json.dumps(conteudo, ensure_ascii=False)) // 4 if conteudo else 0
+
+
+class ServidorGeminiFalso(ThreadingHTTPServer):
+    """Servidor que responde a qualquer POST com uma resposta no formato do Gemini"""
+
+    daemon_threads = True
+
+    def __init__(self, porta=0, latencia=0.0, texto_resposta=RESPOSTA_PADRAO, atraso_trecho=0.0,
+                 palavras_por_trecho=4, taxa_erro=0.0):
+        super().__init__(("127.0.0.1", porta), ManipuladorGemini)
+        self.latencia = latencia
+        self.atraso_trecho = atraso_trecho
+        self.palavras_por_trecho = palavras_por_trecho
+        self.texto_resposta = texto_resposta
+        self.taxa_erro = taxa_erro
+        self.requisicoes = 0
+        self.erros = 0
+        self.caches = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def contar_requisicao(self):
+        """Contabiliza a requisição; retorna False se ela deve falhar com 503"""
+        with self._lock:
+            self.requisicoes += 1
+            if self.taxa_erro and random.random() < self.taxa_erro:
+                self.erros += 1
+                return False
+            return True
+
+    def trechos_resposta(self):
+        """Divide a resposta em trechos de algumas palavras, como o streaming do Gemini"""
+        palavras = self.texto_resposta.split(" ")
+        n = self.palavras_por_trecho
+        return [" ".join(palavras[i:i + n]) + (" " if i + n < len(palavras) else "")
+                for i in range(0, len(palavras), n)]
+
+    def criar_cache(self, pedido):
+        with self._lock:
+            nome = f"cachedContents/simulado-{len(self.caches) + 1}"
+            self.caches[nome] = _estimar_tokens(pedido.get("systemInstruction"))
+        return {"name": nome, "model": pedido.get("model")}
+
+    def contar_tokens(self, pedido):
+        """usageMetadata simulado: instruções de sistema contam como prompt; conteúdo em cache à parte"""
+        tokens_cache = self.caches.get(pedido.get("cachedContent"), 0)
+        tokens_prompt = _estimar_tokens(pedido.get("contents")) + _estimar_tokens(pedido.get("systemInstruction"))
+        return {"promptTokenCount": tokens_prompt + tokens_cache, "cachedContentTokenCount": tokens_cache,
+                "candidatesTokenCount": _estimar_tokens(self.texto_resposta)}
+
+    @property
+    def url(self):
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}/v1beta/models/gemini-2.0-flash:generateContent"
+
+    def iniciar(self):
+        """Inicia o servidor em uma thread de fundo e retorna a URL do endpoint"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def parar(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    latencia_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    atraso_trecho_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    taxa_erro = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+    servidor = ServidorGeminiFalso(porta, latencia_ms / 1000, atraso_trecho=atraso_trecho_ms / 1000,
+                                   taxa_erro=taxa_erro)
+    print(f"Gemini simulado em {servidor.url}")
+    servidor.serve_forever()
@@ -0,0 +1,93 @@
+"""Servidor HTTP (webhook) que atende várias clientes ao mesmo tempo.
+
+Recebe as mensagens repassadas pelo gateway do WhatsApp e devolve as respostas da
+Bella. Todas as sessões vivem no mesmo processo, no MotorConversa de bella.py.
+
+    POST /mensagens   {"telefone": "5511999999999", "mensagem": "1"}
+                      -> {"respostas": ["...", "..."]}
+    GET  /saude       -> {"sessoes": 42, "disjuntor": {"estado": "fechado", "taxa_fallback": 0.0, ...},
+                          "faq": {"entradas": 12, "taxa_acerto": 0.4, ...},
+                          "fila_gemini": {"profundidade": 3, "espera_media": 0.8, "descartadas": {...}, ...}}
+    GET  /metricas    -> métricas no formato texto do Prometheus (com BELLA_METRICAS=1)
+    GET  /rastro/{telefone}
+                      -> {"eventos": [...]} da sessão (com BELLA_METRICAS=1 e BELLA_RASTREIO=1)
+
+Uso: python servidor_webhook.py [porta]
+"""
+import asyncio
+import sys
+
+from aiohttp import web
+
+import bella
+
+INTERVALO_LIMPEZA = 60  # Segundos entre as varreduras de sessões inativas
+
+
+async def receber_mensagem(request):
+    try:
+        dados = await request.json()
+        telefone = str(dados["telefone"])
+        mensagem = str(dados.get("mensagem", ""))
+    except (ValueError, KeyError, TypeError):
+        return web.json_response({"erro": "Envie um JSON com 'telefone' e 'mensagem'."}, status=400)
+
+    respostas = await bella.MOTOR_CONVERSA.processar(telefone, mensagem)
+    return web.json_response({"respostas": respostas})
+
+
+async def saude(request):
+    return web.json_response({
+        "sessoes": len(bella.MOTOR_CONVERSA.sessoes),
+        "disjuntor": bella.DISJUNTOR_GEMINI.estatisticas(),
+        "faq": bella.INDICE_FAQ.estatisticas(),
+        "fila_gemini": bella.ESCALONADOR_GEMINI.estatisticas(),
+    })
+
+
+async def metricas(request):
+    bella.METRICAS.medir("bella_gemini_fila_profundidade", bella.ESCALONADOR_GEMINI.estatisticas()["profundidade"])
+    return web.Response(text=bella.METRICAS.exposicao(), content_type="text/plain", charset="utf-8")
+
+
+async def rastro(request):
+    eventos = [
+        {"timestamp": timestamp, "metrica": nome, "valor": valor, "rotulos": rotulos}
+        for timestamp, nome, valor, rotulos in bella.METRICAS.rastro(request.match_info["telefone"])
+    ]
+    return web.json_response({"eventos": eventos})
+
+
+async def _limpar_sessoes_inativas(app):
+    while True:
+        await asyncio.sleep(INTERVALO_LIMPEZA)
+        bella.MOTOR_CONVERSA.remover_inativas()
+
+
+async def _ao_iniciar(app):
+    app["limpeza"] = asyncio.create_task(_limpar_sessoes_inativas(app))
+
+
+async def _ao_encerrar(app):
+    app["limpeza"].cancel()
+    await bella.CLIENTE_GEMINI.fechar()
+
+
+def criar_app():
+    """Cria a aplicação aiohttp com as rotas do webhook"""
+    bella.criar_tabela_agendamentos_sqlite()
+    app = web.Application()
+    app.router.add_post("/mensagens", receber_mensagem)
+    app.router.add_get("/saude", saude)
+    app.router.add_get("/metricas", metricas)
+    app.router.add_get("/rastro/{telefone}", rastro)
+    app.on_startup.append(_ao_iniciar)
+    app.on_cleanup.append(_ao_encerrar)
+    return app
+
+
+if __name__ == "__main__":
+    if not bella.verificar_api_key():
+        sys.exit(1)
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    web.run_app(criar_app(), port=porta)
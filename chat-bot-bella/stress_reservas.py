@@ -0,0 +1,80 @@
+"""Teste de estresse da reserva atômica de horários.
+
+Várias threads em vários processos disputam o mesmo (dia, profissional, horário) ao
+mesmo tempo; exatamente uma reserva deve ser aceita e todas as outras devem receber
+a lista de alternativas.
+
+Uso: python stress_reservas.py [processos] [threads_por_processo]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import bella
+from armazenamento import BancoDados
+
+DATA = "2030-01-15"
+
+
+def disputar(arquivo, processo, threads, largada, resultados):
+    bella.BANCO = BancoDados(arquivo)
+    bella.criar_tabela_agendamentos_sqlite()
+    barreira = threading.Barrier(threads)
+    aceitas = []
+
+    def tentar(indice):
+        barreira.wait()
+        reservado, motivo, alternativas = bella.registrar_agendamento_sqlite(
+            f"Cliente {processo}-{indice}", "0", "Ana", "Corte", "10:00", DATA
+        )
+        if reservado:
+            aceitas.append(indice)
+        elif motivo != "ocupado":
+            raise AssertionError(f"Horário recusado por {motivo!r} em vez de 'ocupado'")
+        elif "10:00" in alternativas.get("Ana", []):
+            raise AssertionError("Horário recusado mas listado como alternativa")
+
+    largada.wait()
+    trabalhadoras = [threading.Thread(target=tentar, args=(i,)) for i in range(threads)]
+    for t in trabalhadoras:
+        t.start()
+    for t in trabalhadoras:
+        t.join()
+    resultados.put(len(aceitas))
+
+
+def main():
+    processos = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    arquivo = os.path.join(tempfile.mkdtemp(), "stress.db")
+    bella.BANCO = BancoDados(arquivo)
+    bella.criar_tabela_agendamentos_sqlite()
+
+    largada = multiprocessing.Event()
+    resultados = multiprocessing.Queue()
+    filhos = [multiprocessing.Process(target=disputar, args=(arquivo, p, threads, largada, resultados))
+              for p in range(processos)]
+    for filho in filhos:
+        filho.start()
+    time.sleep(0.5)
+    inicio = time.perf_counter()
+    largada.set()
+    aceitas = sum(resultados.get() for _ in filhos)
+    for filho in filhos:
+        filho.join()
+    duracao = time.perf_counter() - inicio
+
+    linhas = bella.conectar_bd().execute(
+        "SELECT COUNT(*) FROM agendamentos WHERE data = ? AND colaboradora = 'Ana' AND horario = '10:00'", (DATA,)
+    ).fetchone()[0]
+    print(f"{processos * threads} tentativas em {duracao:.2f} s: {aceitas} aceita(s), {linhas} linha(s) no banco")
+    if aceitas != 1 or linhas != 1:
+        sys.exit("FALHA: o horário foi reservado mais de uma vez")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import re
+import unicodedata
+
+# Palavras-chave que indicam assuntos dentro do escopo do salão (cabelos e unhas)
+PALAVRAS_CABELO = ['cabelo', 'corte', 'tintura', 'coloração', 'mechas', 'penteado', 'alisamento',
+                   'hidratação', 'reconstrução', 'queratina', 'shampoo', 'condicionador', 'tratamento',
+                   'raiz', 'ponta', 'fio', 'volume', 'brilho', 'caspa', 'couro cabeludo', 'secador',
+                   'chapinha', 'babyliss', 'cachos', 'lisos', 'ondulados', 'crespos', 'loiro',
+                   'morena', 'ruiva', 'grisalho', 'tinta', 'descoloração', 'escova', 'permanente']
+
+PALAVRAS_UNHAS = ['unha', 'manicure', 'pedicure', 'esmalte', 'cutícula', 'gel', 'alongamento',
+                  'fibra', 'acrílica', 'nail art', 'francesinha', 'decoração', 'base', 'top coat',
+                  'acetona', 'lixa', 'alicate', 'fortalecedor', 'quebradiças', 'formato', 'curvatura']
+
+PALAVRAS_SALAO = ['agendar', 'marcar', 'horário', 'serviço', 'atendimento', 'profissional', 'salão',
+                  'estilista', 'cabeleireiro', 'preço', 'valor', 'duração', 'produto', 'promoção',
+                  'desconto', 'bela', 'bella']
+
+
+def normalizar_texto(texto):
+    """Converte o texto para minúsculas e remove acentos ("hidratação" -> "hidratacao")"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def _montar_regex_trie(palavras):
+    """Monta uma alternação em forma de árvore de prefixos.
+
+    O motor de regex do Python testa cada alternativa em sequência; agrupando por
+    prefixo, cada posição do texto é descartada após comparar poucos caracteres.
+    """
+    arvore = {}
+    for palavra in palavras:
+        no = arvore
+        for letra in palavra:
+            no = no.setdefault(letra, {})
+        no[""] = {}
+
+    def montar(no):
+        alternativas = [re.escape(letra) + montar(filho) for letra, filho in sorted(no.items()) if letra]
+        if not alternativas:
+            return ""
+        if len(alternativas) == 1 and "" not in no:
+            return alternativas[0]
+        grupo = "(?:" + "|".join(alternativas) + ")"
+        return grupo + "?" if "" in no else grupo
+
+    return montar(arvore)
+
+
+class ClassificadorTopicos:
+    """Classificador de escopo compilado uma única vez.
+
+    Todas as palavras-chave viram uma única expressão regular em forma de árvore de
+    prefixos, de modo que o texto é percorrido uma só vez, independente da quantidade
+    de palavras. Antes dela, as grafias de `frequentes` são procuradas com `in` no texto
+    só em minúsculas: a maioria das mensagens no escopo cita uma delas e dispensa a
+    remoção de acentos e a expressão, que custam mais que essas poucas buscas.
+    """
+
+    def __init__(self, palavras, frequentes=()):
+        self.palavras = {}
+        for palavra in palavras:
+            self.palavras.setdefault(normalizar_texto(palavra), palavra)
+        # Grafia frequente -> palavra-chave (ex: "horario" e "horário" -> "horário")
+        self.frequentes = [(grafia, self.palavras[normalizar_texto(grafia)]) for grafia in frequentes]
+        self.padrao = re.compile(_montar_regex_trie(self.palavras))
+
+    def classificar(self, texto):
+        """Retorna a palavra-chave encontrada no texto, ou None se estiver fora do escopo"""
+        texto = texto.lower()
+        for grafia, palavra in self.frequentes:
+            if grafia in texto:
+                return palavra
+        encontrado = self.padrao.search(normalizar_texto(texto))
+        if encontrado:
+            return self.palavras[encontrado.group(0)]
+        return None
+
+
+# Grafias mais comuns nas mensagens das clientes, verificadas antes da expressão completa
+PALAVRAS_FREQUENTES = ['cabelo', 'unha', 'corte', 'escova', 'fio', 'horário', 'horario', 'hidratação',
+                       'hidratacao', 'manicure', 'tratamento', 'agendar', 'marcar']
+
+CLASSIFICADOR = ClassificadorTopicos(PALAVRAS_CABELO + PALAVRAS_UNHAS + PALAVRAS_SALAO, PALAVRAS_FREQUENTES)
+
+
+def classificar_topico(texto):
+    """Retorna a palavra-chave permitida encontrada no texto, ou None"""
+    return CLASSIFICADOR.classificar(texto)